@@ -0,0 +1,146 @@
+import functools
+import numpy as np
+
+# --------------------
+# Bulk Board / Row Generator
+# --------------------
+# Colors are stored as int8 color indices with EMPTY (-1) for empty cells.
+# Boards use the same layout as Board.grid: array[board, col, row], row 0 at the top.
+# The generate_* functions make many boards at once: the cell loop runs once per cell position
+# and each step is a vectorized NumPy operation over all boards. A single Board (start board,
+# one row per rise) uses the plain Python versions further down instead, since NumPy's per-call
+# overhead on one cell is far larger than the work. Both use the same rule and draw the same
+# random numbers, so a count=1 call and the single version give the same result for a seed.
+EMPTY = -1
+
+def make_rng(seed):
+    """
+    Returns a NumPy Generator for seed (an int, None, or an existing Generator which is used as is).
+    """
+    if isinstance(seed, np.random.Generator):
+        return seed
+    return np.random.default_rng(seed)
+
+def pair_color(a, b):
+    # Color that would complete a triple next to the pair (a, b), or EMPTY if a and b differ.
+    return np.where((a == b) & (a != EMPTY), a, EMPTY)
+
+def pick_colors(rng, forbidden_a, forbidden_b, num_colors):
+    """
+    Picks one color per board uniformly among the colors not equal to forbidden_a / forbidden_b.
+    With at least 3 colors there is always a valid choice, so no rejection loop is needed.
+    """
+    colors = np.arange(num_colors, dtype=np.int8)
+    allowed = (colors != forbidden_a[:, None]) & (colors != forbidden_b[:, None])
+    counts = allowed.sum(axis=1)
+    nth = (rng.random(forbidden_a.shape[0]) * counts).astype(np.int64)
+    # Index of the nth allowed color: first position where the running count exceeds nth.
+    return np.argmax(np.cumsum(allowed, axis=1) > nth[:, None], axis=1).astype(np.int8)
+
+def generate_boards(seed, count, cols, rows, filled_rows, num_colors):
+    """
+    Generates count starting boards of shape (cols, rows) with the bottom filled_rows rows filled.
+    No board contains a horizontal or vertical run of 3 equal colors.
+    Returns an int8 array of shape (count, cols, rows).
+    """
+    rng = make_rng(seed)
+    grid = np.full((count, cols, rows), EMPTY, dtype=np.int8)
+    for y in range(rows - filled_rows, rows):
+        for x in range(cols):
+            vertical = pair_color(grid[:, x, y - 1], grid[:, x, y - 2]) if y >= 2 else np.full(count, EMPTY, np.int8)
+            horizontal = pair_color(grid[:, x - 1, y], grid[:, x - 2, y]) if x >= 2 else np.full(count, EMPTY, np.int8)
+            grid[:, x, y] = pick_colors(rng, vertical, horizontal, num_colors)
+    return grid
+
+def generate_rows(seed, count, num_rows, cols, num_colors, above=None):
+    """
+    Generates num_rows upcoming rows for each of count boards, in rising order
+    (row 0 rises first and ends up above row 1).
+    No row contains a horizontal run of 3, and no column forms a vertical run of 3 across
+    consecutive rows. If above is given (int8 array of shape (count, 2, cols) holding the two
+    rows directly above the first generated row, EMPTY allowed), runs with it are avoided too,
+    so rising the rows into a board with those bottom rows creates no matches.
+    Returns an int8 array of shape (count, num_rows, cols).
+    """
+    rng = make_rng(seed)
+    if above is None:
+        above = np.full((count, 2, cols), EMPTY, dtype=np.int8)
+    stack = np.concatenate([np.asarray(above, dtype=np.int8),
+                            np.full((count, num_rows, cols), EMPTY, dtype=np.int8)], axis=1)
+    for k in range(2, num_rows + 2):
+        for x in range(cols):
+            vertical = pair_color(stack[:, k - 1, x], stack[:, k - 2, x])
+            horizontal = pair_color(stack[:, k, x - 1], stack[:, k, x - 2]) if x >= 2 else np.full(count, EMPTY, np.int8)
+            stack[:, k, x] = pick_colors(rng, vertical, horizontal, num_colors)
+    return stack[:, 2:]
+
+# ---- Single board ----
+@functools.lru_cache(maxsize=None)
+def allowed_colors(num_colors):
+    """
+    Returns a table where table[a + 1][b + 1] is the tuple of colors (in order) not equal to
+    a or b, for a and b color indices or EMPTY.
+    """
+    return tuple(tuple(tuple(c for c in range(num_colors) if c != a and c != b)
+                       for b in range(EMPTY, num_colors))
+                 for a in range(EMPTY, num_colors))
+
+def generate_board(seed, cols, rows, filled_rows, num_colors):
+    """
+    Generates one starting board like generate_boards, as a list of columns (lists of color
+    indices, EMPTY for empty cells) in the layout of Board.grid.
+    """
+    rng = make_rng(seed)
+    table = allowed_colors(num_colors)
+    draws = iter(rng.random(filled_rows * cols).tolist())
+    grid = [[EMPTY] * rows for _ in range(cols)]
+    for y in range(rows - filled_rows, rows):
+        for x in range(cols):
+            column = grid[x]
+            vertical = column[y - 1] if y >= 2 and column[y - 1] == column[y - 2] else EMPTY
+            horizontal = grid[x - 1][y] if x >= 2 and grid[x - 1][y] == grid[x - 2][y] else EMPTY
+            # Uniform pick among the allowed colors, exactly as pick_colors does it.
+            allowed = table[vertical + 1][horizontal + 1]
+            column[y] = allowed[int(next(draws) * len(allowed))]
+    return grid
+
+def generate_board_rows(seed, num_rows, cols, num_colors, above=None):
+    """
+    Generates num_rows upcoming rows for one board like generate_rows, as a list of rows
+    (lists of color indices). above is None or the two rows directly above the first
+    generated row (top one first).
+    """
+    rng = make_rng(seed)
+    table = allowed_colors(num_colors)
+    draws = iter(rng.random(num_rows * cols).tolist())
+    stack = [list(row) for row in above] if above is not None else [[EMPTY] * cols, [EMPTY] * cols]
+    for _ in range(num_rows):
+        upper, lower = stack[-2], stack[-1]
+        row = [EMPTY] * cols
+        for x in range(cols):
+            vertical = lower[x] if lower[x] == upper[x] else EMPTY
+            horizontal = row[x - 1] if x >= 2 and row[x - 1] == row[x - 2] else EMPTY
+            allowed = table[vertical + 1][horizontal + 1]
+            row[x] = allowed[int(next(draws) * len(allowed))]
+        stack.append(row)
+    return stack[2:]
+
+def generate_game(seed, cols, rows, filled_rows, num_colors):
+    """
+    Generates what a new Board starts with: the start board (as generate_board) and the two
+    upcoming rows that rise into it (as generate_board_rows). Returns (grid, upcoming_rows).
+    """
+    rng = make_rng(seed)
+    grid = generate_board(rng, cols, rows, filled_rows, num_colors)
+    bottom_rows = [[column[y] for column in grid] for y in (rows - 2, rows - 1)]
+    return grid, generate_board_rows(rng, 2, cols, num_colors, above=bottom_rows)
+
+def has_matches(grid):
+    """
+    Returns a boolean array (one entry per board) telling whether a board of shape
+    (count, cols, rows) contains any horizontal or vertical run of 3 equal, non-empty colors.
+    """
+    filled = grid != EMPTY
+    horizontal = (filled[:, :-2, :] & (grid[:, :-2, :] == grid[:, 1:-1, :]) & (grid[:, 1:-1, :] == grid[:, 2:, :]))
+    vertical = (filled[:, :, :-2] & (grid[:, :, :-2] == grid[:, :, 1:-1]) & (grid[:, :, 1:-1] == grid[:, :, 2:]))
+    return horizontal.any(axis=(1, 2)) | vertical.any(axis=(1, 2))
@@ -0,0 +1,169 @@
+import argparse
+import math
+import random
+import sys
+import time
+from main import Board, Cursor, advance_frame, advance_difficulty, ACTION_LEFT, ACTION_SWAP, GRID_COLS, GRID_ROWS, GAME_OVER_TIME
+
+# --------------------
+# Frame-Rate Independence Check
+# --------------------
+# Plays the same seeded input script on the same seeded board at several simulated frame rates
+# and compares the outcome with the reference rate (60 Hz, what the timings were tuned at).
+# The script is written in game time, not frames: an input at t seconds goes into the first
+# frame that starts at or after t, so every rate sees the same inputs at (almost) the same time.
+#
+# Per rate it reports score, matches, cleared panels, rises, when the board topped out, the
+# first checkpoint (one per second) where the grid no longer matches the reference, and the
+# CPU time spent per simulated second.
+#
+#   python framerate.py                          30/60/144/240/1000 Hz, 60 s, seed 1
+#   python framerate.py --rates 60 120 --seconds 120 --seed 7
+DEFAULT_RATES = (30, 60, 144, 240, 1000)
+REFERENCE_RATE = 60
+
+class EventCounter:
+    # Stands in for SessionTelemetry on the board and counts what the simulation reports.
+    def __init__(self):
+        self.matches = 0
+        self.cleared = 0
+        self.rises = 0
+
+    def record(self, kind, **fields):
+        if kind == "match":
+            self.matches += 1
+            self.cleared += fields["size"]
+        elif kind == "rise":
+            self.rises += 1
+
+def make_script(seed, seconds, actions_per_second=8.0):
+    """
+    Returns a list of (time, shift_pressed, actions) entries: a player who moves the cursor
+    and swaps several times per second (enough to keep the default board alive for a while)
+    and holds Left Shift now and then. Times are in seconds.
+    """
+    rng = random.Random(seed)
+    script = []
+    t = 0.0
+    shift = False
+    while True:
+        t += rng.expovariate(actions_per_second)
+        if t >= seconds:
+            return script
+        if rng.random() < (0.5 if shift else 0.01):
+            shift = not shift
+        actions = [rng.randint(ACTION_LEFT, ACTION_SWAP)]
+        if rng.random() < 0.5:
+            actions.append(ACTION_SWAP)
+        script.append((t, shift, actions))
+
+def grid_colors(board):
+    # The grid as a tuple of colour indices per cell (-1 for empty), for comparing boards.
+    return tuple(-1 if panel is None else panel.color_index for column in board.grid for panel in column)
+
+def run_rate(rate, script, seconds, seed, cols=GRID_COLS, rows=GRID_ROWS):
+    """
+    Simulates seconds of game time at rate Hz the way Game.run does (difficulty steps, then
+    advance_frame) and returns a dict with the outcome, the grid at every whole second and
+    the CPU time used.
+    """
+    dt = 1 / rate
+    frames = round(seconds * rate)
+    # Inputs by frame: frame n covers [n * dt, (n + 1) * dt).
+    inputs = {}
+    for t, shift, actions in script:
+        frame = math.ceil(t * rate - 1e-9)
+        entry = inputs.setdefault(frame, [shift, []])
+        entry[0] = shift
+        entry[1].extend(actions)
+    board = Board(seed=seed, cols=cols, rows=rows)
+    counter = EventCounter()
+    board.telemetry = counter
+    cursor = Cursor(cols, rows)
+    difficulty_timer = 0.0
+    shift = False
+    checkpoints = {}
+    next_checkpoint = 1
+    topped_out = None
+    start_cpu = time.process_time()
+    start = time.perf_counter()
+    for frame in range(frames):
+        actions = ()
+        if frame in inputs:
+            shift, actions = inputs[frame]
+        difficulty_timer = advance_difficulty(board, difficulty_timer + dt)
+        advance_frame(board, cursor, dt, shift, actions)
+        if (frame + 1) * dt >= next_checkpoint - 1e-9:
+            checkpoints[next_checkpoint] = grid_colors(board)
+            next_checkpoint += 1
+        if board.top_row_timer >= GAME_OVER_TIME:
+            topped_out = (frame + 1) * dt
+            break
+    cpu = time.process_time() - start_cpu
+    wall = time.perf_counter() - start
+    simulated = (frame + 1) * dt
+    return {
+        "rate": rate, "frames": frame + 1, "score": board.score, "matches": counter.matches,
+        "cleared": counter.cleared, "rises": counter.rises, "topped_out": topped_out,
+        "checkpoints": checkpoints,
+        "cpu_ms_per_second": 1000 * cpu / simulated,
+        "us_per_frame": 1e6 * wall / (frame + 1),
+    }
+
+def compare(result, reference):
+    """
+    Returns (first checkpoint second where the grids differ or None, cells differing at the
+    last checkpoint both runs reached, names of the summary values that differ).
+    """
+    first_divergence = None
+    cells = 0
+    for second in sorted(set(result["checkpoints"]) & set(reference["checkpoints"])):
+        differing = sum(a != b for a, b in zip(result["checkpoints"][second], reference["checkpoints"][second]))
+        if differing and first_divergence is None:
+            first_divergence = second
+        cells = differing
+    differs = [key for key in ("score", "matches", "cleared", "rises") if result[key] != reference[key]]
+    # Top-out times can only be as exact as a frame of either rate.
+    if (result["topped_out"] is None) != (reference["topped_out"] is None) or (
+            result["topped_out"] is not None
+            and abs(result["topped_out"] - reference["topped_out"]) > 1 / result["rate"] + 1 / reference["rate"]):
+        differs.append("topped_out")
+    return first_divergence, cells, differs
+
+def main(argv):
+    parser = argparse.ArgumentParser(description="Compare the same seeded game at several frame rates")
+    parser.add_argument("--rates", nargs="+", type=int, default=DEFAULT_RATES, help="simulated frame rates (Hz)")
+    parser.add_argument("--reference", type=int, default=REFERENCE_RATE, help="rate the others are compared with")
+    parser.add_argument("--seconds", type=float, default=60.0, help="game time per run")
+    parser.add_argument("--seed", type=int, default=1, help="seed of the board and the input script")
+    args = parser.parse_args(argv)
+
+    rates = sorted(set(args.rates) | {args.reference})
+    script = make_script(args.seed, args.seconds)
+    results = {rate: run_rate(rate, script, args.seconds, args.seed) for rate in rates}
+    reference = results[args.reference]
+
+    print("seed %d, %d inputs over %.0f s, compared with %d Hz\n" % (args.seed, len(script), args.seconds, args.reference))
+    print("%6s %7s %7s %7s %7s %5s %8s %9s %6s %11s %9s" % (
+        "rate", "frames", "score", "matches", "cleared", "rises", "top out", "diverged", "cells",
+        "cpu ms/sim s", "us/frame"))
+    divergent = []
+    for rate in rates:
+        result = results[rate]
+        first_divergence, cells, differs = compare(result, reference)
+        if rate != args.reference and (differs or first_divergence is not None):
+            divergent.append((rate, differs))
+        print("%6d %7d %7d %7d %7d %5d %8s %9s %6d %11.1f %9.1f" % (
+            rate, result["frames"], result["score"], result["matches"], result["cleared"], result["rises"],
+            "-" if result["topped_out"] is None else "%.1fs" % result["topped_out"],
+            "-" if first_divergence is None else "%ds" % first_divergence, cells,
+            result["cpu_ms_per_second"], result["us_per_frame"]))
+    print()
+    if not divergent:
+        print("All rates match the %d Hz run." % args.reference)
+    for rate, differs in divergent:
+        print("%d Hz diverges from %d Hz%s" % (rate, args.reference, ": " + ", ".join(differs) if differs else " (grid only)"))
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv[1:]))
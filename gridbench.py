@@ -0,0 +1,96 @@
+import argparse
+import random
+import sys
+import time
+import types
+import numpy as np
+import pygame
+from main import Board, Cursor, Game, SurfaceBackend, advance_frame, ACTION_LEFT, ACTION_SWAP, GAME_OVER_TIME
+
+# --------------------
+# Grid Size Benchmark
+# --------------------
+# Plays the same kind of seeded input script on boards of increasing size and charts the
+# frame time against board area: simulation (advance_frame) and, with --render, drawing the
+# board with the Surface backend.
+#
+#   python gridbench.py                      default sizes, simulation only
+#   python gridbench.py --render 6x12 64x128
+DEFAULT_SIZES = ((6, 12), (12, 24), (16, 32), (24, 48), (32, 64), (48, 96), (64, 128))
+
+def parse_size(text):
+    cols, rows = (int(part) for part in text.lower().split("x"))
+    return cols, rows
+
+def run_size(cols, rows, frames, dt, seed, backend=None, screen_size=None):
+    """
+    Simulates frames frames on a cols x rows board (two thirds filled, like the default
+    8 of 12 rows) and returns the per-frame simulation and render times in milliseconds.
+    """
+    rng = random.Random(seed)
+    board = Board(seed=seed, cols=cols, rows=rows, filled_rows=rows * 2 // 3)
+    cursor = Cursor(cols, rows)
+    layout = None
+    if backend is not None:
+        layout = Game.compute_layout(types.SimpleNamespace(native_size=screen_size, board=board))
+    sim_ms = np.empty(frames)
+    render_ms = np.empty(frames) if backend is not None else None
+    for frame in range(frames):
+        # A player swapping about 8 times per second, jumping to a new spot now and then.
+        if rng.random() < 0.02:
+            cursor.x, cursor.y = rng.randrange(cols - 1), rng.randrange(rows // 3, rows)
+        actions = []
+        if rng.random() < 8 * dt:
+            actions = [rng.randint(ACTION_LEFT, ACTION_SWAP), ACTION_SWAP]
+        start = time.perf_counter()
+        advance_frame(board, cursor, dt, False, actions)
+        sim_ms[frame] = (time.perf_counter() - start) * 1000
+        if backend is not None:
+            start = time.perf_counter()
+            backend.draw_board(board, cursor, *layout)
+            render_ms[frame] = (time.perf_counter() - start) * 1000
+        if board.top_row_timer >= GAME_OVER_TIME:
+            # Keep measuring a live board: start over with the next seed.
+            seed += 1
+            board = Board(seed=seed, cols=cols, rows=rows, filled_rows=rows * 2 // 3)
+    return sim_ms, render_ms
+
+def chart(rows, width=40):
+    # Horizontal bar chart of (label, value) pairs, scaled to the largest value.
+    peak = max(value for _, value in rows) or 1.0
+    for label, value in rows:
+        print("%-22s %8.3f ms |%s" % (label, value, "#" * max(1, round(value / peak * width))))
+
+def main(argv):
+    parser = argparse.ArgumentParser(description="Frame time against board area")
+    parser.add_argument("sizes", nargs="*", type=parse_size, default=DEFAULT_SIZES,
+                        help="board sizes as COLSxROWS (default: 6x12 up to 64x128)")
+    parser.add_argument("--frames", type=int, default=1800, help="frames simulated per size")
+    parser.add_argument("--rate", type=float, default=60.0, help="simulated frame rate (Hz)")
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--render", action="store_true", help="also time drawing with the Surface backend")
+    parser.add_argument("--screen", type=parse_size, default=(1920, 1080), help="screen size for --render")
+    args = parser.parse_args(argv)
+
+    backend = SurfaceBackend(args.screen) if args.render else None
+    results = []
+    print("%9s %7s  %10s %10s  %10s %10s" % ("grid", "area", "sim mean", "sim p95", "draw mean", "draw p95"))
+    for cols, rows in args.sizes:
+        sim_ms, render_ms = run_size(cols, rows, args.frames, 1 / args.rate, args.seed, backend, args.screen)
+        line = "%9s %7d  %10.3f %10.3f" % ("%dx%d" % (cols, rows), cols * rows,
+                                           sim_ms.mean(), np.percentile(sim_ms, 95))
+        if render_ms is not None:
+            line += "  %10.3f %10.3f" % (render_ms.mean(), np.percentile(render_ms, 95))
+        print(line)
+        results.append((cols, rows, sim_ms.mean(), None if render_ms is None else render_ms.mean()))
+
+    print("\nSimulation frame time by board area:")
+    chart([("%dx%d (%d cells)" % (cols, rows, cols * rows), sim) for cols, rows, sim, _ in results])
+    if args.render:
+        print("\nDraw time by board area:")
+        chart([("%dx%d (%d cells)" % (cols, rows, cols * rows), draw) for cols, rows, _, draw in results])
+        pygame.quit()
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv[1:]))
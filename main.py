@@ -1,19 +1,28 @@
 import asyncio  # NEW: added for pygbag compatibility
 import pygame
 import pygame.freetype
-import random
 import sys
 import math
+import struct
+import time
+from collections import OrderedDict, deque
 import numpy as np  # Ensure you have numpy installed: pip install numpy
+import boardgen
+from replay import ReplayRecorder
+from telemetry import SessionTelemetry
 
 pygame.init()
 
 # --------------------
 # Configuration Values
 # --------------------
-# Grid dimensions
+# Grid dimensions (defaults; Board, Cursor and Game take the size as configuration, see --grid)
 GRID_COLS = 6
 GRID_ROWS = 12
+GRID_MIN = 3      # smallest columns/rows that can hold a match
+GRID_MAX = 255    # snapshots store the size in one byte each and cell indices in 16 bits
+FILLED_ROWS = 8   # rows filled with blocks at the start of a game
+DANGER_ROWS = 4   # danger music plays while any block is within this many rows of the top
 PANEL_SIZE = 320  # Increased native resolution: Pixel size of one cell (increased for high-res rendering)
 
 # Animation durations (in seconds)
@@ -22,6 +31,12 @@ CLEAR_DURATION = 0.8   # increased delay for clearing blocks (allows combo displ
 BASE_FALL_DELAY = 0.2  # increased delay for falling blocks
 FALL_DELAY_MIN = 0.08
 FALL_HOLD = 0.1       # time to pause before dropping a cell
+FALL_START_DELAY = 0.05  # base delay before an unsupported panel starts falling
+
+# Rising floor and game over (in seconds)
+START_RISE_DELAY = 5.0  # seconds for one full cell rise at the start of a game
+MIN_RISE_DELAY = 1      # rising speed will never exceed 1 sec per cell
+GAME_OVER_TIME = 3      # the game ends once a panel has occupied the top row this long
 
 # Input timings (in seconds)
 INPUT_BUFFER = 0.05
@@ -50,24 +65,91 @@ CURSOR_COLOR = (255, 255, 255)
 # NEW: Combo text duration
 COMBO_TEXT_DURATION = 0.3  # increased from 0.1 so the combo text lingers a bit longer
 
+# Audio setup presets: mixer frequency (Hz), mixer buffer size (samples, lower = less latency
+# but more risk of crackling) and number of mixer channels ("voices") for sound effects.
+AUDIO_PRESETS = {
+    "default": {"frequency": 44100, "buffer": 512, "voices": 16},
+    "low_latency": {"frequency": 48000, "buffer": 256, "voices": 32},
+    "safe": {"frequency": 44100, "buffer": 2048, "voices": 16},  # slow machines / browsers
+}
+AUDIO_PRESET = "default"
+
+# Rendering backend: "surface" draws everything in software onto pygame Surfaces,
+# "texture" uploads sprites once and lets an SDL renderer scale and compose them.
+# Can be overridden at startup with --renderer=texture (and --render-driver=software).
+RENDERER_BACKEND = "surface"
+
+# Panel states (integer codes, compared on every cell every frame).
+PANEL_IDLE = 0
+PANEL_SWAPPING = 1
+PANEL_FALLING = 2
+PANEL_CLEARING = 3
+
 # --------------------
 # Panel Class
 # --------------------
 class Panel:
+    # All fields are declared up front; Board recycles Panel objects through a free-list pool.
+    __slots__ = (
+        "color_index", "state", "grid_x", "grid_y",
+        "swap_timer", "swap_direction", "swap_origin",
+        "clear_timer", "clear_delay", "anim_duration", "anim_elapsed",
+        "sound_index", "sound_played",
+        "fall_timer", "fall_delay_extended",
+        "anim_offset",
+    )
+
     def __init__(self, color_index, grid_x, grid_y):
+        # For animation offset (in pixels), used during swap or falling
+        self.anim_offset = [0, 0]
+        self.reset(color_index, grid_x, grid_y)
+
+    def reset(self, color_index, grid_x, grid_y):
+        """
+        (Re)initializes every field so that a pooled panel is indistinguishable from a new one.
+        """
         self.color_index = color_index  # index into PANEL_COLORS
-        self.state = "idle"  # idle, swapping, falling, or clearing
+        self.state = PANEL_IDLE  # idle, swapping, falling, or clearing
         self.grid_x = grid_x
         self.grid_y = grid_y
-        
+
         # Animation timers (in seconds)
         self.swap_timer = 0
+        self.swap_direction = 0
+        self.swap_origin = 0
         self.clear_timer = 0
         self.fall_timer = 0
         self.fall_delay_extended = False  # flag to know if delay has been extended once
-        
-        # For animation offset (in pixels), used during swap or falling
-        self.anim_offset = [0, 0]
+
+        # Clearing animation: stagger delay, duration and progress, plus which vanish sound to play.
+        self.clear_delay = 0
+        self.anim_duration = 0
+        self.anim_elapsed = 0.0
+        self.sound_index = 0
+        self.sound_played = False
+
+        self.anim_offset[0] = 0
+        self.anim_offset[1] = 0
+
+    def copy_from(self, other):
+        # Field-by-field copy used by Board.clone (much cheaper than copy.deepcopy).
+        self.color_index = other.color_index
+        self.state = other.state
+        self.grid_x = other.grid_x
+        self.grid_y = other.grid_y
+        self.swap_timer = other.swap_timer
+        self.swap_direction = other.swap_direction
+        self.swap_origin = other.swap_origin
+        self.clear_timer = other.clear_timer
+        self.fall_timer = other.fall_timer
+        self.fall_delay_extended = other.fall_delay_extended
+        self.clear_delay = other.clear_delay
+        self.anim_duration = other.anim_duration
+        self.anim_elapsed = other.anim_elapsed
+        self.sound_index = other.sound_index
+        self.sound_played = other.sound_played
+        self.anim_offset[0] = other.anim_offset[0]
+        self.anim_offset[1] = other.anim_offset[1]
 
     def draw(self, surface, offset_y=0):
         # Determine pixel position based on grid + animation offset, subtracting the rising offset.
@@ -75,10 +157,10 @@ class Panel:
         y = round(self.grid_y * PANEL_SIZE + self.anim_offset[1] - offset_y)
         color = PANEL_COLORS[self.color_index]
         
-        if self.state == "clearing":
+        if self.state == PANEL_CLEARING:
             # Calculate progress of the disappearance animation.
             progress = 1
-            if hasattr(self, "anim_elapsed") and hasattr(self, "anim_duration") and self.anim_duration > 0:
+            if self.anim_duration > 0:
                 progress = min(self.anim_elapsed / self.anim_duration, 1)
             # Use progress to compute the scale factor (full size when progress==0, gone when progress==1)
             scale_factor = 1 - progress
@@ -169,45 +251,119 @@ def draw_symbol(surface, symbol_type, center, size, color=(0,0,0)):
         radius = size // 3  # Adjust radius as needed
         pygame.draw.circle(surface, color, (int(x), int(y)), radius)
 
+def render_preview_tile(color_index):
+    """
+    Renders a translucent preview tile (used for the upcoming rows) onto a new PANEL_SIZE surface.
+    """
+    color = PANEL_COLORS[color_index]
+    preview = pygame.Surface((PANEL_SIZE, PANEL_SIZE), pygame.SRCALPHA)
+    preview.fill((0,0,0,0))
+
+    # Draw darkened edge for the preview.
+    darkened_color = (
+        max(0, int(color[0] * 0.8)),
+        max(0, int(color[1] * 0.8)),
+        max(0, int(color[2] * 0.8)),
+        80
+    )
+    pygame.draw.rect(preview, darkened_color, (0, 0, PANEL_SIZE, PANEL_SIZE))
+
+    # Draw a centered inner rectangle (brighter center) with a thinner edge.
+    margin = int(PANEL_SIZE * 0.1)         # 10% edge thickness
+    inner_size = PANEL_SIZE - 2 * margin      # inner square is 80% of PANEL_SIZE
+    bright_color = (color[0], color[1], color[2], 80)
+    pygame.draw.rect(preview, bright_color, (margin, margin, inner_size, inner_size))
+
+    # Instead of text, draw the symbol geometry.
+    symbol_type = color_index  # 0: heart, 1: star, 2: clover, 3: diamond
+    symbol_size = int(PANEL_SIZE * 0.6)
+    center = (PANEL_SIZE//2, PANEL_SIZE//2)
+    draw_symbol(preview, symbol_type, center, symbol_size, color=(0,0,0))
+    return preview
+
+# --------------------
+# Board Snapshot Format
+# --------------------
+# Little-endian binary layout written by Board.snapshot() and read by Board.restore():
+#   header      magic, format version, grid columns, grid rows, number of colors
+#   scalars     the Board fields listed in SNAPSHOT_SCALARS
+#   columns     col_fall_offsets (one double per column)
+#   rows        upcoming_row and next_upcoming_row (one int8 per column each)
+#   rng         PCG64 state and increment (128-bit each), has_uint32, uinteger
+#   panels      panel count, then one SNAPSHOT_PANEL record per occupied cell
+SNAPSHOT_MAGIC = b"TASN"
+SNAPSHOT_VERSION = 1
+SNAPSHOT_HEADER = struct.Struct("<4sBBBB")
+SNAPSHOT_SCALARS = (
+    ("score", "q"),
+    ("swap_lockout_timer", "d"),
+    ("current_fall_delay", "d"),
+    ("current_chain_base_delay", "d"),
+    ("current_chain_incremental_delay", "d"),
+    ("current_rise_delay", "d"),
+    ("min_rise_delay", "d"),
+    ("rise_offset", "d"),
+    ("top_row_timer", "d"),
+    ("chain_pause_timer", "d"),
+    ("match_delay_timer", "d"),
+    ("risen_this_frame", "?"),
+    ("match_event_active", "?"),
+)
+SNAPSHOT_SCALARS_STRUCT = struct.Struct("<" + "".join(fmt for _, fmt in SNAPSHOT_SCALARS))
+SNAPSHOT_RNG = struct.Struct("<16s16sBI")
+SNAPSHOT_COUNT = struct.Struct("<H")
+# Panel positions are implied by the cell index (grid_x/grid_y always match the grid slot).
+SNAPSHOT_PANEL = np.dtype([
+    ("cell", "<u2"), ("color_index", "i1"), ("state", "i1"), ("sound_index", "i1"),
+    ("swap_direction", "i1"), ("sound_played", "?"), ("fall_delay_extended", "?"),
+    ("swap_timer", "<f8"), ("swap_origin", "<f8"), ("clear_timer", "<f8"), ("clear_delay", "<f8"),
+    ("anim_duration", "<f8"), ("anim_elapsed", "<f8"), ("fall_timer", "<f8"),
+    ("anim_x", "<f8"), ("anim_y", "<f8"),
+])
+
 # --------------------
 # Board Class
 # --------------------
+def panel_grid_order(panel):
+    # Sort key that visits panels in the same order as a column-by-column scan of the grid.
+    return (panel.grid_x, panel.grid_y)
+
+def check_grid_size(cols, rows, filled_rows=0):
+    # Raises ValueError unless cols x rows is a supported grid and filled_rows fits in it.
+    if not (GRID_MIN <= cols <= GRID_MAX and GRID_MIN <= rows <= GRID_MAX):
+        raise ValueError("Grid size must be between %dx%d and %dx%d, got %dx%d"
+                         % (GRID_MIN, GRID_MIN, GRID_MAX, GRID_MAX, cols, rows))
+    if not 0 <= filled_rows <= rows:
+        raise ValueError("Cannot fill %d rows of a %d-row grid" % (filled_rows, rows))
+
 class Board:
-    def __init__(self):
-        # Initialize grid: only bottom 8 rows have blocks; top 4 rows are empty.
+    def __init__(self, seed=None, cols=GRID_COLS, rows=GRID_ROWS, filled_rows=FILLED_ROWS):
+        check_grid_size(cols, rows, filled_rows)
+        self.cols = cols
+        self.rows = rows
+        # Free-list of Panel objects released by clears and rises; reused by acquire_panel().
+        self.panel_pool = []
+        # AudioEngine provided by the Game (left as None when running without audio).
+        self.audio = None
+        # Optional SessionTelemetry (see telemetry.py); events are only recorded when set.
+        self.telemetry = None
+
+        # Per-board random generator (pass a seed for reproducible games).
+        self.rng = boardgen.make_rng(seed)
+        self.num_colors = len(PANEL_COLORS) if ENABLE_FIFTH_SYMBOL else 4
+
+        # Initialize grid: only the bottom filled_rows rows have blocks; the rows above are empty.
+        # The generator guarantees there are no vertical/horizontal matches on the start board.
+        # The same call also draws the upcoming rows, which never match the bottom rows.
+        colors, upcoming = boardgen.generate_game(self.rng, cols, rows, filled_rows, self.num_colors)
         self.grid = []
-        for x in range(GRID_COLS):
-            col_data = []
-            for y in range(GRID_ROWS):
-                if y < GRID_ROWS - 8:
-                    col_data.append(None)
-                else:
-                    # Choose a color index that avoids immediate vertical/horizontal matches.
-                    available_color = random.randrange(len(PANEL_COLORS) if ENABLE_FIFTH_SYMBOL else 4)
-
-                    # Check vertical: if there are at least two panels already in this column.
-                    if y >= (GRID_ROWS - 8 + 2):
-                        while (col_data[y - 1] is not None and col_data[y - 2] is not None and
-                               col_data[y - 1].color_index == available_color and
-                               col_data[y - 2].color_index == available_color):
-                            available_color = random.randrange(len(PANEL_COLORS) if ENABLE_FIFTH_SYMBOL else 4)
-
-                    # Check horizontal: if there are at least two previously built columns.
-                    if x >= 2:
-                        # Get the panels from the previous two columns at row y.
-                        left_panel = self.grid[x - 1][y] if self.grid[x - 1][y] is not None else None
-                        left2_panel = self.grid[x - 2][y] if self.grid[x - 2][y] is not None else None
-                        if left_panel is not None and left2_panel is not None:
-                            while left_panel.color_index == available_color and left2_panel.color_index == available_color:
-                                available_color = random.randrange(len(PANEL_COLORS) if ENABLE_FIFTH_SYMBOL else 4)
-
-                    col_data.append(Panel(available_color, x, y))
-            self.grid.append(col_data)
+        for x in range(cols):
+            self.grid.append([self.acquire_panel(c, x, y) if c != boardgen.EMPTY else None
+                              for y, c in enumerate(colors[x])])
 
         # Initialize upcoming row for preview (each value is a color index).
-        self.upcoming_row = [random.randrange(len(PANEL_COLORS) if ENABLE_FIFTH_SYMBOL else 4) for _ in range(GRID_COLS)]
         # NEW: also store the next upcoming row so that it is visible before spawning.
-        self.next_upcoming_row = [random.randrange(len(PANEL_COLORS) if ENABLE_FIFTH_SYMBOL else 4) for _ in range(GRID_COLS)]
+        self.upcoming_row, self.next_upcoming_row = upcoming
         
         self.swap_lockout_timer = 0
         self.score = 0
@@ -216,67 +372,129 @@ class Board:
         self.current_chain_incremental_delay = CHAIN_INCREMENTAL_DELAY_INIT
 
         # Rising Floor Mechanic (smooth rising)
-        self.current_rise_delay = 5.0  # seconds for one full cell rise
-        self.min_rise_delay = 1      # rising speed will never exceed 1 sec per cell
+        self.current_rise_delay = START_RISE_DELAY  # seconds for one full cell rise
+        self.min_rise_delay = MIN_RISE_DELAY
         self.rise_offset = 0         # current vertical offset (in pixels)
         self.top_row_timer = 0
         self.risen_this_frame = False
+        self.rise_count = 0          # rises so far (the Surface backend scrolls its cached panels by it)
 
         # Timer to pause rising during extensive matches.
         self.chain_pause_timer = 0
         # (No combo chain/timer mechanics anymore)
 
         # Shared fall offset (in pixels) for each column; used only when blocks are actively falling.
-        self.col_fall_offsets = [0 for _ in range(GRID_COLS)]
+        self.col_fall_offsets = [0 for _ in range(cols)]
         # New: match delay timer; after a drop, wait 0.25 seconds before checking for matches.
         self.match_delay_timer = 0
 
         # Add a flag for match event so that a match only triggers once until the board settles.
         self.match_event_active = False
+        self.rebuild_tracking()
+
+    # ---- Active work tracking ----
+    # update() only visits the parts of the board that can change, so a large, mostly settled
+    # board costs about as much per frame as a small one:
+    #   animating       panels that are swapping or clearing
+    #   active_columns  columns that may hold a falling panel, a panel waiting to fall, a gap
+    #                   under a panel or a leftover fall offset; a column leaves the set when
+    #                   scan_column() finds none of these
+    #   match_cells     cells whose matchable panel changed since the board was last found
+    #                   match-free (None: check the whole grid); every match includes one of them
+    #   column_tops     row of the topmost panel per column (rows when empty); never below the
+    #                   real top (it may be higher), and exact after update()
+    #   redraw_columns  columns whose resting panels may look different since the Surface backend
+    #                   cached them; the backend empties it after redrawing them
+    # Each one may hold more than the real work but never less, so results are the same as
+    # scanning the whole grid. Code that edits grid directly must call rebuild_tracking().
+    def rebuild_tracking(self):
+        self.animating = set()
+        for column in self.grid:
+            for panel in column:
+                if panel is not None and panel.state in (PANEL_SWAPPING, PANEL_CLEARING):
+                    self.animating.add(panel)
+        self.match_cells = None
+        self.column_tops = [0] * self.cols
+        self.active_columns = set()
+        for col in range(self.cols):
+            settled, self.column_tops[col] = self.scan_column(col)
+            if not settled:
+                self.active_columns.add(col)
+        self.redraw_columns = set(range(self.cols))
+
+    def scan_column(self, col):
+        """
+        Returns (settled, top) for a column: settled means no falling panel, no panel waiting
+        to fall, no gap under a panel and no fall offset; top is the row of the topmost panel.
+        """
+        column = self.grid[col]
+        top = self.column_tops[col]
+        while top < self.rows and column[top] is None:
+            top += 1
+        if self.col_fall_offsets[col] != 0:
+            return False, top
+        for row in range(top, self.rows):
+            panel = column[row]
+            if (panel is None or panel.state == PANEL_FALLING
+                    or panel.fall_timer > 0 or panel.fall_delay_extended):
+                return False, top
+        return True, top
+
+    def mark_match_cell(self, col, row):
+        # Record a cell whose matchable panel changed (see match_cells).
+        if self.match_cells is not None:
+            self.match_cells.add((col, row))
+
+    def top_panel_row(self):
+        # Row of the highest panel on the board (rows when the board is empty).
+        return min(self.column_tops)
 
     def update(self, dt, shift_pressed=False):
         # Update swap lockout timer
         if self.swap_lockout_timer > 0:
             self.swap_lockout_timer -= dt
 
-        # Update panels on board
-        for col in range(GRID_COLS):
-            for row in range(GRID_ROWS):
-                panel = self.grid[col][row]
-                if panel is None:
-                    continue
-                # Update swapping state
-                if panel.state == "swapping":
-                    panel.swap_timer -= dt
-                    progress = 1 - (panel.swap_timer / SWAP_DURATION)
-                    if progress >= 1:
-                        progress = 1
-                        panel.anim_offset[0] = 0
-                        panel.state = "idle"
-                    else:
-                        panel.anim_offset[0] = panel.swap_origin * (1 - progress)
-                # Update clearing state
-                if panel.state == "clearing":
-                    # Stagger the animation using clear_delay.
-                    if panel.clear_delay > 0:
-                        panel.clear_delay -= dt
-                        if panel.clear_delay < 0:
-                            # If dt overshoots, add excess time to anim_elapsed.
-                            panel.anim_elapsed += -panel.clear_delay
-                            panel.clear_delay = 0
-                    else:
-                        panel.anim_elapsed += dt
-                        # Play vanish sound as soon as the animation starts (if not yet played)
-                        if not panel.sound_played:
-                            if hasattr(self, "vanish_sounds") and self.vanish_sounds:
-                                sound_idx = panel.sound_index if hasattr(panel, "sound_index") else 0
-                                self.vanish_sounds[sound_idx].play()
-                            panel.sound_played = True
-
-                    progress = min(panel.anim_elapsed / panel.anim_duration, 1)
-                    if progress >= 1:
-                        self.grid[col][row] = None
-                    continue
+        # Update swapping and clearing panels (in grid order, like a full scan would).
+        for panel in sorted(self.animating, key=panel_grid_order):
+            # Update swapping state
+            if panel.state == PANEL_SWAPPING:
+                panel.swap_timer -= dt
+                progress = 1 - (panel.swap_timer / SWAP_DURATION)
+                if progress >= 1:
+                    progress = 1
+                    panel.anim_offset[0] = 0
+                    panel.state = PANEL_IDLE
+                    self.animating.discard(panel)
+                    self.redraw_columns.add(panel.grid_x)
+                else:
+                    panel.anim_offset[0] = panel.swap_origin * (1 - progress)
+            # Update clearing state
+            if panel.state == PANEL_CLEARING:
+                # Stagger the animation using clear_delay.
+                if panel.clear_delay > 0:
+                    panel.clear_delay -= dt
+                    if panel.clear_delay < 0:
+                        # If dt overshoots, add excess time to anim_elapsed.
+                        panel.anim_elapsed += -panel.clear_delay
+                        panel.clear_delay = 0
+                else:
+                    panel.anim_elapsed += dt
+                # Play vanish sound as soon as the animation starts (if not yet played),
+                # in the same frame the stagger delay runs out.
+                if panel.clear_delay <= 0 and not panel.sound_played:
+                    if self.audio is not None:
+                        # anim_elapsed is how far (in game time) the visuals are already ahead.
+                        self.audio.play_vanish(panel.sound_index, late=panel.anim_elapsed)
+                    panel.sound_played = True
+
+                progress = min(panel.anim_elapsed / panel.anim_duration, 1)
+                if progress >= 1:
+                    # The emptied cell may leave panels above it unsupported.
+                    self.grid[panel.grid_x][panel.grid_y] = None
+                    self.active_columns.add(panel.grid_x)
+                    self.redraw_columns.add(panel.grid_x)
+                    self.animating.discard(panel)
+                    self.release_panel(panel)
 
         # Apply gravity for panels that are idle and have empty cells below.
         if self.chain_pause_timer <= 0:
@@ -285,7 +503,7 @@ class Board:
         # --- Check for matches with a fixed delay  ---
         # If not already in a match event, look for a match and (if found) set a constant delay.
         if not self.match_event_active:
-            matches = self.check_matches()
+            matches = self.find_matches()
             if matches:
                 self.match_event_active = True
                 # If the board is not stable (i.e. some panels are falling or waiting), double the recheck time.
@@ -298,24 +516,28 @@ class Board:
             self.match_delay_timer -= dt
             if self.match_delay_timer <= 0:
                 # Final check: process the match if still present.
-                matches = self.check_matches()
+                matches = self.find_matches()
                 if matches:
                     match_size = len(matches)
                     # Set freeze time: 0.5 seconds for a 4+ match, 0.25 seconds for a 3-match.
                     freeze_time = 1 if match_size >= 4 else 0.75
                     self.chain_pause_timer = freeze_time
                     if match_size >= 4:
-                        if hasattr(self, "chain_sound"):
-                            self.chain_sound.play()
+                        if self.audio is not None:
+                            self.audio.play_chain()
                     # Sort matches so that they clear in an order (e.g. top-to-bottom, left-to-right)
                     matches_sorted = sorted(matches, key=lambda pos: (pos[1], pos[0]))
+                    if self.telemetry is not None:
+                        self.telemetry.record("match", size=match_size, cells=matches_sorted)
+                        self.telemetry.record("freeze", duration=freeze_time)
                     # Assign a sound delay for each panel: later ones will have a longer delay.
                     num = len(matches_sorted)
                     for i, (col, row) in enumerate(matches_sorted):
                         panel = self.grid[col][row]
-                        if panel and panel.state != "clearing":
-                            panel.anim_offset = [0, 0]
-                            panel.state = "clearing"
+                        if panel and panel.state != PANEL_CLEARING:
+                            panel.anim_offset[0] = 0
+                            panel.anim_offset[1] = 0
+                            panel.state = PANEL_CLEARING
                             # Subtract a small offset (0.05 sec) so that the vanish sound plays a bit earlier.
                             panel.clear_delay = max(0, i * (CLEAR_DURATION / num) - 0.05)
                             panel.anim_duration = CLEAR_DURATION - panel.clear_delay
@@ -323,8 +545,12 @@ class Board:
                             # Retain the vanish sound index as before.
                             panel.sound_index = i if i < 7 else 6
                             panel.sound_played = False
+                            self.animating.add(panel)
+                            self.redraw_columns.add(col)
                     self.score += 100 * match_size
                     self.top_row_timer = 0
+                    # Every match on the board is clearing now, so no cell needs rechecking.
+                    self.match_cells = set()
                 # Reset the match event flag so new matches can be detected.
                 self.match_event_active = False
 
@@ -338,7 +564,7 @@ class Board:
             rising_speed = PANEL_SIZE / effective_delay
 
         # Prevent rising if any block in the top row is present.
-        top_occupied = any(self.grid[col][0] is not None for col in range(GRID_COLS))
+        top_occupied = any(self.grid[col][0] is not None for col in range(self.cols))
         if top_occupied:
             rising_speed = 0
 
@@ -349,10 +575,12 @@ class Board:
             self.risen_this_frame = True
             # Increase rising speed gradually, but not below the minimum.
             self.current_rise_delay = max(self.min_rise_delay, self.current_rise_delay - 0.1)
+            if self.telemetry is not None:
+                self.telemetry.record("rise", rise_delay=self.current_rise_delay, fast=bool(shift_pressed))
 
         # Check for game over: if any block occupies the top row for 3 or more seconds.
         game_over = False
-        for col in range(GRID_COLS):
+        for col in range(self.cols):
             if self.grid[col][0] is not None:
                 # Drawn y = (grid row * PANEL_SIZE) - rise_offset
                 drawn_y = 0 * PANEL_SIZE - self.rise_offset
@@ -366,12 +594,16 @@ class Board:
         # ------------------------------------------
 
         # Smooth Falling Animation using a continuously accumulating column offset.
-        for col in range(GRID_COLS):
+        # Settled columns hold no falling panel and no offset, so only active ones are visited;
+        # rows above column_tops are empty and skipped.
+        for col in sorted(self.active_columns):
+            column = self.grid[col]
+            top = self.column_tops[col]
             # Check if the column has any falling panel.
             falling_in_column = False
-            for row in range(GRID_ROWS):
-                panel = self.grid[col][row]
-                if panel is not None and panel.state == "falling":
+            for row in range(top, self.rows):
+                panel = column[row]
+                if panel is not None and panel.state == PANEL_FALLING:
                     falling_in_column = True
                     break
 
@@ -385,40 +617,49 @@ class Board:
 
             # If offset has reached a full cell, snap falling panels one cell at a time.
             while self.col_fall_offsets[col] >= PANEL_SIZE:
-                for row in range(GRID_ROWS-1, -1, -1):
-                    panel = self.grid[col][row]
-                    if panel is not None and panel.state == "falling":
+                for row in range(self.rows-1, top-1, -1):
+                    panel = column[row]
+                    if panel is not None and panel.state == PANEL_FALLING:
                         target_y = panel.grid_y + 1
-                        if target_y < GRID_ROWS and self.grid[col][target_y] is None:
-                            self.grid[col][panel.grid_y] = None
+                        if target_y < self.rows and column[target_y] is None:
+                            column[panel.grid_y] = None
                             panel.grid_y = target_y
-                            self.grid[col][panel.grid_y] = panel
+                            column[panel.grid_y] = panel
                             any_drop = True
                         else:
-                            panel.state = "idle"
+                            panel.state = PANEL_IDLE
+                            # A landed panel can complete a match.
+                            self.mark_match_cell(col, panel.grid_y)
                         panel.anim_offset[1] = 0
                 self.col_fall_offsets[col] -= PANEL_SIZE
 
             # Calculate smooth progress (0 to 1) from the remaining offset.
             progress = self.col_fall_offsets[col] / PANEL_SIZE
-            for row in range(GRID_ROWS-1, -1, -1):
-                panel = self.grid[col][row]
-                if panel is not None and panel.state == "falling":
+            for row in range(self.rows-1, top-1, -1):
+                panel = column[row]
+                if panel is not None and panel.state == PANEL_FALLING:
                     # If the panel is at the bottom or cannot fall further, force offset to 0.
-                    if panel.grid_y == GRID_ROWS - 1 or (panel.grid_y < GRID_ROWS - 1 and self.grid[col][panel.grid_y+1] is not None):
+                    if panel.grid_y == self.rows - 1 or (panel.grid_y < self.rows - 1 and column[panel.grid_y+1] is not None):
                         panel.anim_offset[1] = 0
                     else:
                         panel.anim_offset[1] = progress * PANEL_SIZE
 
+            settled, self.column_tops[col] = self.scan_column(col)
+            if settled:
+                self.active_columns.discard(col)
+                self.redraw_columns.add(col)
+
     def apply_gravity(self, dt):
         # Start from second-to-last row upward (bottom row cannot fall)
-        FALL_START_DELAY = 0.05  # base delay before a panel starts falling
-        for col in range(GRID_COLS):
-            for row in range(GRID_ROWS - 2, -1, -1):
-                panel = self.grid[col][row]
-                if panel is None or panel.state != "idle":
+        # Only active columns can hold unsupported or waiting panels (see rebuild_tracking).
+        columns = sorted(self.active_columns)
+        for col in columns:
+            column = self.grid[col]
+            for row in range(self.rows - 2, self.column_tops[col] - 1, -1):
+                panel = column[row]
+                if panel is None or panel.state != PANEL_IDLE:
                     continue
-                if self.grid[col][row+1] is None:
+                if column[row+1] is None:
                     # Set base delay and adjust if chain freeze (match of 4+ blocks) is active.
                     base_delay = FALL_START_DELAY
                     if self.chain_pause_timer > 0:
@@ -433,7 +674,7 @@ class Board:
                         panel.fall_delay_extended = True
                     panel.fall_timer -= dt
                     if panel.fall_timer <= 0:
-                        panel.state = "falling"
+                        panel.state = PANEL_FALLING
                         panel.fall_timer = 0
                         panel.fall_delay_extended = False
                 else:
@@ -442,12 +683,13 @@ class Board:
                     panel.fall_delay_extended = False
         # Cascade falling: if an idle panel has a falling block right beneath it,
         # force the idle panel to fall immediately.
-        for col in range(GRID_COLS):
-            for row in range(0, GRID_ROWS - 1):
-                current = self.grid[col][row]
-                below = self.grid[col][row+1]
-                if current is not None and current.state == "idle" and below is not None and below.state == "falling":
-                    current.state = "falling"
+        for col in columns:
+            column = self.grid[col]
+            for row in range(self.column_tops[col], self.rows - 1):
+                current = column[row]
+                below = column[row+1]
+                if current is not None and current.state == PANEL_IDLE and below is not None and below.state == PANEL_FALLING:
+                    current.state = PANEL_FALLING
 
     def get_effective_panel(self, col, row):
         """
@@ -455,7 +697,7 @@ class Board:
         Falling panels (i.e. panels whose state is "falling") are ignored so that they only match when they've landed.
         """
         panel = self.grid[col][row]
-        if panel is not None and panel.state == "falling":
+        if panel is not None and panel.state == PANEL_FALLING:
             return None
         return panel
 
@@ -463,12 +705,12 @@ class Board:
         # Return all matched panels as long as there are at least 3 matches.
         to_clear = set()
         # horizontal matches: allow falling blocks to be matched as long as they aren't clearing.
-        for row in range(GRID_ROWS):
+        for row in range(self.rows):
             count = 1
-            for col in range(1, GRID_COLS):
+            for col in range(1, self.cols):
                 curr = self.get_effective_panel(col, row)
                 prev = self.get_effective_panel(col - 1, row)
-                if (curr and prev and curr.state != "clearing" and prev.state != "clearing"
+                if (curr and prev and curr.state != PANEL_CLEARING and prev.state != PANEL_CLEARING
                         and curr.color_index == prev.color_index):
                     count += 1
                 else:
@@ -478,15 +720,15 @@ class Board:
                     count = 1
             if count >= 3:
                 for k in range(count):
-                    to_clear.add((GRID_COLS - 1 - k, row))
+                    to_clear.add((self.cols - 1 - k, row))
                     
         # vertical matches: now use the effective panels.
-        for col in range(GRID_COLS):
+        for col in range(self.cols):
             count = 1
-            for row in range(1, GRID_ROWS):
+            for row in range(1, self.rows):
                 curr = self.get_effective_panel(col, row)
                 prev = self.get_effective_panel(col, row - 1)
-                if (curr and prev and curr.state != "clearing" and prev.state != "clearing"
+                if (curr and prev and curr.state != PANEL_CLEARING and prev.state != PANEL_CLEARING
                         and curr.color_index == prev.color_index):
                     count += 1
                 else:
@@ -496,16 +738,57 @@ class Board:
                     count = 1
             if count >= 3:
                 for k in range(count):
-                    to_clear.add((col, GRID_ROWS - 1 - k))
+                    to_clear.add((col, self.rows - 1 - k))
  
         # Return all matched panels as long as there are at least 3 matches.
         if len(to_clear) >= 3:
             return list(to_clear)
         return []
 
+    def matchable_color(self, col, row):
+        # Color of the panel at (col, row) if it can take part in a match (see check_matches), else None.
+        panel = self.grid[col][row]
+        if panel is None or panel.state == PANEL_FALLING or panel.state == PANEL_CLEARING:
+            return None
+        return panel.color_index
+
+    def find_matches(self):
+        """
+        Same result as check_matches(), but only follows the runs through the cells in
+        match_cells instead of scanning every row and column. When the board turns out to
+        have no match, the recorded cells are forgotten.
+        """
+        if self.match_cells is None:
+            matches = self.check_matches()
+        else:
+            to_clear = set()
+            for col, row in self.match_cells:
+                color = self.matchable_color(col, row)
+                if color is None:
+                    continue
+                # Extend the horizontal and the vertical run through the cell as far as the color goes.
+                left = right = col
+                while left > 0 and self.matchable_color(left - 1, row) == color:
+                    left -= 1
+                while right < self.cols - 1 and self.matchable_color(right + 1, row) == color:
+                    right += 1
+                if right - left >= 2:
+                    to_clear.update((c, row) for c in range(left, right + 1))
+                top = bottom = row
+                while top > 0 and self.matchable_color(col, top - 1) == color:
+                    top -= 1
+                while bottom < self.rows - 1 and self.matchable_color(col, bottom + 1) == color:
+                    bottom += 1
+                if bottom - top >= 2:
+                    to_clear.update((col, r) for r in range(top, bottom + 1))
+            matches = list(to_clear) if len(to_clear) >= 3 else []
+        if not matches:
+            self.match_cells = set()
+        return matches
+
     def do_swap(self, x, y):
         # Ensure coordinates are within range.
-        if x < 0 or x >= GRID_COLS - 1 or y < 0 or y >= GRID_ROWS:
+        if x < 0 or x >= self.cols - 1 or y < 0 or y >= self.rows:
             return
         p1 = self.grid[x][y]
         p2 = self.grid[x+1][y]
@@ -515,24 +798,26 @@ class Board:
             return
 
         # Only allow swapping if both panels are idle.
-        if (p1 is not None and p1.state != "idle") or (p2 is not None and p2.state != "idle"):
+        if (p1 is not None and p1.state != PANEL_IDLE) or (p2 is not None and p2.state != PANEL_IDLE):
             return
 
         # Initiate swapping animation for panels that exist.
         if p1 is not None:
-            p1.state = "swapping"
+            p1.state = PANEL_SWAPPING
             p1.swap_timer = SWAP_DURATION
             p1.swap_direction = +1
             # Set the initial offset so that the left panel starts from -PANEL_SIZE.
             p1.swap_origin = -PANEL_SIZE
             p1.anim_offset[0] = p1.swap_origin
+            self.animating.add(p1)
         if p2 is not None:
-            p2.state = "swapping"
+            p2.state = PANEL_SWAPPING
             p2.swap_timer = SWAP_DURATION
             p2.swap_direction = -1
             # The right panel starts from +PANEL_SIZE.
             p2.swap_origin = PANEL_SIZE
             p2.anim_offset[0] = p2.swap_origin
+            self.animating.add(p2)
 
         # Swap positions in the grid.
         self.grid[x][y], self.grid[x+1][y] = p2, p1
@@ -543,118 +828,226 @@ class Board:
         if p2 is not None:
             p2.grid_x = x
 
+        # Both cells changed: recheck them for matches and let gravity look at both columns.
+        for col in (x, x + 1):
+            self.mark_match_cell(col, y)
+            self.active_columns.add(col)
+            self.redraw_columns.add(col)
+            if self.grid[col][y] is not None:
+                self.column_tops[col] = min(self.column_tops[col], y)
+
         # Set swap lockout to a third of the original time.
         self.swap_lockout_timer = SWAP_LOCKOUT / 6
 
         # Play swap sound effect if available.
-        if hasattr(self, "swap_sound"):
-            self.swap_sound.play()
-
-    def draw(self, surface):
-        # Draw each panel with a vertical shift of rise_offset.
-        for col in range(GRID_COLS):
-            for row in range(GRID_ROWS):
-                panel = self.grid[col][row]
-                if panel:
-                    panel.draw(surface, offset_y=self.rise_offset)
-        # Draw upcoming row preview below the grid.
-        self.draw_upcoming(surface)
-
-    def draw_upcoming(self, surface):
-        # Compute the base y-position as exactly at the bottom edge of the main grid.
-        base_y = GRID_ROWS * PANEL_SIZE
-
-        # Draw the imminent preview row (which will spawn next) at the very bottom of the grid.
-        for col in range(GRID_COLS):
-            color_index = self.upcoming_row[col]
-            color = PANEL_COLORS[color_index]
-            preview = pygame.Surface((PANEL_SIZE, PANEL_SIZE), pygame.SRCALPHA)
-            preview.fill((0,0,0,0))
-
-            # Draw darkened edge for the preview.
-            darkened_color = (
-                max(0, int(color[0] * 0.8)),
-                max(0, int(color[1] * 0.8)),
-                max(0, int(color[2] * 0.8)),
-                80
-            )
-            pygame.draw.rect(preview, darkened_color, (0, 0, PANEL_SIZE, PANEL_SIZE))
-
-            # Draw a centered inner rectangle (brighter center) with a thinner edge.
-            margin = int(PANEL_SIZE * 0.1)         # 10% edge thickness
-            inner_size = PANEL_SIZE - 2 * margin      # inner square is 80% of PANEL_SIZE
-            bright_color = (color[0], color[1], color[2], 80)
-            pygame.draw.rect(preview, bright_color, (margin, margin, inner_size, inner_size))
-
-            # Instead of text, draw the symbol geometry.
-            symbol_type = color_index  # 0: heart, 1: star, 2: clover, 3: diamond
-            symbol_size = int(PANEL_SIZE * 0.6)
-            center = (PANEL_SIZE//2, PANEL_SIZE//2)
-            draw_symbol(preview, symbol_type, center, symbol_size, color=(0,0,0))
-
-            # Round the positions for smooth, jitter-free placement.
-            x = round(col * PANEL_SIZE)
-            y = round(base_y - self.rise_offset)
-            surface.blit(preview, (x, y))
-
-        # Draw the next preview row (for continuity) exactly one cell below the imminent preview.
-        for col in range(GRID_COLS):
-            color_index = self.next_upcoming_row[col]
-            color = PANEL_COLORS[color_index]
-            preview = pygame.Surface((PANEL_SIZE, PANEL_SIZE), pygame.SRCALPHA)
-            preview.fill((0,0,0,0))
-
-            # Darkened edge.
-            darkened_color = (
-                max(0, int(color[0] * 0.8)),
-                max(0, int(color[1] * 0.8)),
-                max(0, int(color[2] * 0.8)),
-                80
-            )
-            pygame.draw.rect(preview, darkened_color, (0, 0, PANEL_SIZE, PANEL_SIZE))
-
-            # Centered inner rectangle (bright center).
-            margin = int(PANEL_SIZE * 0.1)
-            inner_size = PANEL_SIZE - 2 * margin
-            bright_color = (color[0], color[1], color[2], 80)
-            pygame.draw.rect(preview, bright_color, (margin, margin, inner_size, inner_size))
-
-            # Instead of text, draw the symbol geometry.
-            symbol_type = color_index  # 0: heart, 1: star, 2: clover, 3: diamond
-            symbol_size = int(PANEL_SIZE * 0.6)
-            center = (PANEL_SIZE//2, PANEL_SIZE//2)
-            draw_symbol(preview, symbol_type, center, symbol_size, color=(0,0,0))
-
-            # Round positions to avoid jitter.
-            x = round(col * PANEL_SIZE)
-            y = round(base_y - self.rise_offset + PANEL_SIZE)
-            surface.blit(preview, (x, y))
+        if self.audio is not None:
+            self.audio.play_swap()
 
     # ---- Added rise method ----
     def rise(self):
         # Shift all panels upward by one full cell.
-        for col in range(GRID_COLS):
-            self.grid[col].pop(0)
+        self.rise_count += 1
+        for col in range(self.cols):
+            column = self.grid[col]
+            top_panel = column.pop(0)
+            if top_panel is not None:
+                self.animating.discard(top_panel)
+                self.release_panel(top_panel)
             # Use the color from the upcoming row so that the spawned block matches the preview.
             new_color = self.upcoming_row[col]
-            new_panel = Panel(new_color, col, GRID_ROWS - 1)
-            self.grid[col].append(new_panel)
-        for col in range(GRID_COLS):
-            for row in range(GRID_ROWS):
-                panel = self.grid[col][row]
+            new_panel = self.acquire_panel(new_color, col, self.rows - 1)
+            column.append(new_panel)
+            # Everything moved up one row (an empty column now holds just the new panel).
+            top = max(0, self.column_tops[col] - 1)
+            self.column_tops[col] = top
+            for row in range(top, self.rows):
+                panel = column[row]
                 if panel:
                     panel.grid_y = row
-        # Update the upcoming row with new random blocks.
+        # Cells waiting for a match check moved up with their panels; the new row is checked too.
+        if self.match_cells is not None:
+            self.match_cells = {(col, row - 1) for col, row in self.match_cells if row > 0}
+            self.match_cells.update((col, self.rows - 1) for col in range(self.cols))
+        # Update the upcoming row with new random blocks that will not form a match
+        # with the bottom row and the upcoming row when they rise in.
         self.upcoming_row = self.next_upcoming_row
-        self.next_upcoming_row = [random.randrange(len(PANEL_COLORS) if ENABLE_FIFTH_SYMBOL else 4) for _ in range(GRID_COLS)]
+        bottom_row = [panel.color_index if panel is not None else boardgen.EMPTY
+                      for panel in (column[self.rows - 1] for column in self.grid)]
+        self.next_upcoming_row = boardgen.generate_board_rows(
+            self.rng, 1, self.cols, self.num_colors, above=(bottom_row, self.upcoming_row))[0]
+
+    def snapshot(self):
+        """
+        Serializes the complete board state (grid, panel timers, offsets, match flags,
+        upcoming rows and RNG state) to a compact bytes object; see SNAPSHOT_HEADER.
+        """
+        rng_state = self.rng.bit_generator.state
+        if rng_state["bit_generator"] != "PCG64":
+            raise ValueError("Board snapshots require a PCG64 random generator")
+        records = []
+        for col in range(self.cols):
+            for row in range(self.rows):
+                p = self.grid[col][row]
+                if p is not None:
+                    records.append((col * self.rows + row, p.color_index, p.state, p.sound_index,
+                                    p.swap_direction, p.sound_played, p.fall_delay_extended,
+                                    p.swap_timer, p.swap_origin, p.clear_timer, p.clear_delay,
+                                    p.anim_duration, p.anim_elapsed, p.fall_timer,
+                                    p.anim_offset[0], p.anim_offset[1]))
+        return b"".join((
+            SNAPSHOT_HEADER.pack(SNAPSHOT_MAGIC, SNAPSHOT_VERSION, self.cols, self.rows, self.num_colors),
+            SNAPSHOT_SCALARS_STRUCT.pack(*(getattr(self, name) for name, _ in SNAPSHOT_SCALARS)),
+            struct.pack("<%dd" % self.cols, *self.col_fall_offsets),
+            np.array([self.upcoming_row, self.next_upcoming_row], dtype=np.int8).tobytes(),
+            SNAPSHOT_RNG.pack(rng_state["state"]["state"].to_bytes(16, "little"),
+                              rng_state["state"]["inc"].to_bytes(16, "little"),
+                              rng_state["has_uint32"], rng_state["uinteger"]),
+            SNAPSHOT_COUNT.pack(len(records)),
+            np.array(records, dtype=SNAPSHOT_PANEL).tobytes(),
+        ))
+
+    def restore(self, data):
+        """
+        Restores the state written by snapshot() in place. Panels are recycled through the pool;
+        sounds and telemetry attached to this board are kept.
+        """
+        magic, version, cols, rows, num_colors = SNAPSHOT_HEADER.unpack_from(data, 0)
+        if magic != SNAPSHOT_MAGIC or version != SNAPSHOT_VERSION:
+            raise ValueError("Not a board snapshot (or unsupported version)")
+        if (cols, rows) != (self.cols, self.rows):
+            raise ValueError("Snapshot grid size %dx%d does not match %dx%d" % (cols, rows, self.cols, self.rows))
+        offset = SNAPSHOT_HEADER.size
+        self.num_colors = num_colors
+        for (name, _), value in zip(SNAPSHOT_SCALARS, SNAPSHOT_SCALARS_STRUCT.unpack_from(data, offset)):
+            setattr(self, name, value)
+        offset += SNAPSHOT_SCALARS_STRUCT.size
+        self.col_fall_offsets = list(struct.unpack_from("<%dd" % self.cols, data, offset))
+        offset += 8 * self.cols
+        upcoming = np.frombuffer(data, dtype=np.int8, count=2 * self.cols, offset=offset).reshape(2, self.cols)
+        self.upcoming_row = upcoming[0].tolist()
+        self.next_upcoming_row = upcoming[1].tolist()
+        offset += 2 * self.cols
+        rng_state, rng_inc, has_uint32, uinteger = SNAPSHOT_RNG.unpack_from(data, offset)
+        self.rng = np.random.Generator(np.random.PCG64())
+        self.rng.bit_generator.state = {
+            "bit_generator": "PCG64",
+            "state": {"state": int.from_bytes(rng_state, "little"), "inc": int.from_bytes(rng_inc, "little")},
+            "has_uint32": has_uint32,
+            "uinteger": uinteger,
+        }
+        offset += SNAPSHOT_RNG.size
+        (count,) = SNAPSHOT_COUNT.unpack_from(data, offset)
+        offset += SNAPSHOT_COUNT.size
+        records = np.frombuffer(data, dtype=SNAPSHOT_PANEL, count=count, offset=offset)
+
+        for col in range(self.cols):
+            for row in range(self.rows):
+                if self.grid[col][row] is not None:
+                    self.release_panel(self.grid[col][row])
+                    self.grid[col][row] = None
+        for record in records.tolist():
+            (cell, color_index, state, sound_index, swap_direction, sound_played, fall_delay_extended,
+             swap_timer, swap_origin, clear_timer, clear_delay, anim_duration, anim_elapsed, fall_timer,
+             anim_x, anim_y) = record
+            col, row = divmod(cell, self.rows)
+            p = self.acquire_panel(color_index, col, row)
+            p.state = state
+            p.sound_index = sound_index
+            p.swap_direction = swap_direction
+            p.sound_played = sound_played
+            p.fall_delay_extended = fall_delay_extended
+            p.swap_timer = swap_timer
+            p.swap_origin = swap_origin
+            p.clear_timer = clear_timer
+            p.clear_delay = clear_delay
+            p.anim_duration = anim_duration
+            p.anim_elapsed = anim_elapsed
+            p.fall_timer = fall_timer
+            p.anim_offset[0] = anim_x
+            p.anim_offset[1] = anim_y
+            self.grid[col][row] = p
+        self.rebuild_tracking()
+
+    @classmethod
+    def from_snapshot(cls, data):
+        # Builds a new, detached board (no sounds, no telemetry) from snapshot() bytes.
+        board = cls.__new__(cls)
+        _, _, cols, rows, _ = SNAPSHOT_HEADER.unpack_from(data, 0)
+        board.init_detached(cols, rows)
+        board.restore(data)
+        return board
+
+    def init_detached(self, cols=GRID_COLS, rows=GRID_ROWS):
+        # Minimal attribute setup for boards that are filled by restore() or clone().
+        self.cols = cols
+        self.rows = rows
+        self.panel_pool = []
+        self.audio = None
+        self.telemetry = None
+        self.grid = [[None] * rows for _ in range(cols)]
+        self.rise_count = 0
+
+    def clone(self):
+        """
+        Returns an independent copy of this board for lookahead/branching.
+        The clone is detached: it plays no sounds and records no telemetry.
+        """
+        board = Board.__new__(Board)
+        board.init_detached(self.cols, self.rows)
+        board.__dict__.update(
+            (key, value) for key, value in self.__dict__.items()
+            if key not in ("grid", "panel_pool", "audio", "telemetry", "animating"))
+        board.col_fall_offsets = self.col_fall_offsets[:]
+        board.active_columns = set(self.active_columns)
+        board.redraw_columns = set(self.redraw_columns)
+        board.match_cells = None if self.match_cells is None else set(self.match_cells)
+        board.column_tops = self.column_tops[:]
+        board.animating = set()
+        board.upcoming_row = self.upcoming_row[:]
+        board.next_upcoming_row = self.next_upcoming_row[:]
+        bit_generator = type(self.rng.bit_generator)()
+        bit_generator.state = self.rng.bit_generator.state
+        board.rng = np.random.Generator(bit_generator)
+        for col in range(self.cols):
+            source_col = self.grid[col]
+            target_col = board.grid[col]
+            for row in range(self.rows):
+                source = source_col[row]
+                if source is not None:
+                    panel = Panel.__new__(Panel)
+                    panel.anim_offset = [0, 0]
+                    panel.copy_from(source)
+                    target_col[row] = panel
+                    if source in self.animating:
+                        board.animating.add(panel)
+        return board
+
+    def acquire_panel(self, color_index, grid_x, grid_y):
+        # Reuse a released panel if one is available instead of allocating a new one.
+        if self.panel_pool:
+            panel = self.panel_pool.pop()
+            panel.reset(color_index, grid_x, grid_y)
+            return panel
+        return Panel(color_index, grid_x, grid_y)
+
+    def release_panel(self, panel):
+        # Return a panel that has left the grid to the free-list.
+        self.panel_pool.append(panel)
+
+    def is_quiescent(self):
+        # True when nothing on the board animates or is pending: no chain freeze, no match
+        # waiting to be processed, every panel idle and no panel waiting to fall.
+        if self.chain_pause_timer > 0 or self.match_event_active or self.animating:
+            return False
+        return self.board_is_stable()
 
     def board_is_stable(self):
-        # Returns True if no panel is falling or waiting to fall (via fall_timer)
-        for col in range(GRID_COLS):
-            for row in range(GRID_ROWS):
-                panel = self.grid[col][row]
+        # Returns True if no panel is falling or waiting to fall (via fall_timer).
+        # Settled columns have neither, so only the active ones are checked.
+        for col in self.active_columns:
+            for panel in self.grid[col]:
                 if panel is not None:
-                    if panel.state == "falling" or panel.fall_timer > 0:
+                    if panel.state == PANEL_FALLING or panel.fall_timer > 0:
                         return False
         return True
 
@@ -662,40 +1055,561 @@ class Board:
 # Cursor Class
 # --------------------
 class Cursor:
-    def __init__(self):
+    def __init__(self, cols=GRID_COLS, rows=GRID_ROWS):
+        # Grid size the cursor is confined to (the board's cols/rows).
+        self.cols = cols
+        self.rows = rows
         # Starts at upper left
         self.x = 0
         self.y = 0
 
     def move(self, dx, dy):
         # Allow horizontal movement, ensuring the cursor never leaves the board.
-        self.x = max(0, min(GRID_COLS - 2, self.x + dx))
+        self.x = max(0, min(self.cols - 2, self.x + dx))
         # If moving upward and already at top row, do nothing.
         if dy < 0 and self.y == 0:
             return
-        self.y = max(0, min(GRID_ROWS - 1, self.y + dy))
+        self.y = max(0, min(self.rows - 1, self.y + dy))
 
-    def draw(self, surface, offset_y=0):
-        x = self.x * PANEL_SIZE
-        y = self.y * PANEL_SIZE - offset_y
-        # Adjust the border margin to scale with PANEL_SIZE (default is 2 when PANEL_SIZE is 40).
+# --------------------
+# Frame Simulation
+# --------------------
+# Gameplay actions (one per key press); used by Game.run, replays and the vector environment.
+ACTION_NOOP = 0
+ACTION_LEFT = 1
+ACTION_RIGHT = 2
+ACTION_UP = 3
+ACTION_DOWN = 4
+ACTION_SWAP = 5
+
+# Move cursor using either arrow keys or WASD; Enter/Space swaps.
+KEY_ACTIONS = {
+    pygame.K_LEFT: ACTION_LEFT, pygame.K_a: ACTION_LEFT,
+    pygame.K_RIGHT: ACTION_RIGHT, pygame.K_d: ACTION_RIGHT,
+    pygame.K_UP: ACTION_UP, pygame.K_w: ACTION_UP,
+    pygame.K_DOWN: ACTION_DOWN, pygame.K_s: ACTION_DOWN,
+    pygame.K_SPACE: ACTION_SWAP, pygame.K_RETURN: ACTION_SWAP,
+}
+
+def advance_frame(board, cursor, dt, shift_pressed, actions):
+    """
+    Simulates one frame exactly as Game.run does: applies the frame's actions (ignored while
+    the swap lockout is active), updates the board and makes the cursor follow a rise.
+    """
+    for action in actions:
+        if board.swap_lockout_timer > 0:
+            continue
+        if action == ACTION_LEFT:
+            cursor.move(-1, 0)
+        elif action == ACTION_RIGHT:
+            cursor.move(1, 0)
+        elif action == ACTION_UP:
+            cursor.move(0, -1)
+        elif action == ACTION_DOWN:
+            cursor.move(0, 1)
+        elif action == ACTION_SWAP:
+            # When swapping, swap the panel under the cursor with the one to its right
+            board.do_swap(cursor.x, cursor.y)
+
+    board.update(dt, shift_pressed)
+    # If a full cell rise occurred, adjust the cursor upward to follow the blocks.
+    if board.risen_this_frame:
+        cursor.y = max(cursor.y - 1, 0)
+
+def advance_difficulty(board, difficulty_timer):
+    """
+    Applies the 30-second difficulty step to the board and returns the remaining timer.
+    """
+    if difficulty_timer >= 30:
+        difficulty_timer -= 30
+        # Decrease falling delay but not below min
+        board.current_fall_delay = max(FALL_DELAY_MIN, board.current_fall_delay - 0.01)
+        # Decrease chain delays (base and incremental) with minimum base delay check
+        board.current_chain_base_delay = max(CHAIN_BASE_DELAY_MIN, board.current_chain_base_delay - 0.02)
+        board.current_chain_incremental_delay = max(0, board.current_chain_incremental_delay - 0.01)
+    return difficulty_timer
+
+# --------------------
+# Frame Scheduling
+# --------------------
+class FrameScheduler:
+    """
+    Decides how often Game.run presents a frame.
+    Runs at the full refresh rate while anything on screen moves or input arrives. Drops to
+    idle_rate when the window is unfocused or when the board has been still (no rise, no
+    animation, no input) for idle_after frames, and to hidden_rate while minimized/hidden.
+    Throttled waits are sliced so that input (or regaining focus) wakes the loop immediately.
+    Time and CPU time spent in each mode are accumulated for report().
+    """
+    WAKE_EVENTS = (pygame.KEYDOWN, pygame.KEYUP, pygame.QUIT, pygame.VIDEORESIZE,
+                   pygame.WINDOWFOCUSGAINED, pygame.WINDOWRESTORED, pygame.WINDOWSHOWN)
+
+    def __init__(self, full_rate, idle_rate=10, hidden_rate=2, idle_after=30, enabled=True):
+        # An unknown (0) rate would simulate whole throttled frames in one step.
+        self.full_rate = full_rate if full_rate > 0 else 60
+        self.idle_rate = idle_rate
+        self.hidden_rate = hidden_rate
+        self.idle_after = idle_after
+        self.enabled = enabled
+        self.focused = True
+        self.hidden = False
+        self.still_frames = 0
+        self.last_signature = None
+        self.mode = "full"
+        # mode -> [frames, wall seconds, cpu seconds]
+        self.stats = {"full": [0, 0.0, 0.0], "idle": [0, 0.0, 0.0], "unfocused": [0, 0.0, 0.0], "hidden": [0, 0.0, 0.0]}
+        self.last_wall = time.perf_counter()
+        self.last_cpu = time.process_time()
+
+    def observe_event(self, event):
+        if event.type == pygame.WINDOWFOCUSLOST:
+            self.focused = False
+        elif event.type == pygame.WINDOWFOCUSGAINED:
+            self.focused = True
+        elif event.type in (pygame.WINDOWMINIMIZED, pygame.WINDOWHIDDEN):
+            self.hidden = True
+        elif event.type in (pygame.WINDOWRESTORED, pygame.WINDOWSHOWN, pygame.WINDOWMAXIMIZED):
+            self.hidden = False
+
+    def end_frame(self, game, had_input):
+        # Anything that moves on screen at full rate: rise, cursor, score, panel animations.
+        board = game.board
+        signature = (board.rise_offset, game.cursor.x, game.cursor.y, board.score, board.is_quiescent())
+        if had_input or signature != self.last_signature or not signature[-1]:
+            self.still_frames = 0
+        else:
+            self.still_frames += 1
+        self.last_signature = signature
+
+        now_wall, now_cpu = time.perf_counter(), time.process_time()
+        entry = self.stats[self.mode]
+        entry[0] += 1
+        entry[1] += now_wall - self.last_wall
+        entry[2] += now_cpu - self.last_cpu
+        self.last_wall, self.last_cpu = now_wall, now_cpu
+
+        if not self.enabled:
+            self.mode = "full"
+        elif self.hidden:
+            self.mode = "hidden"
+        elif not self.focused:
+            self.mode = "unfocused"
+        elif self.still_frames >= self.idle_after:
+            self.mode = "idle"
+        else:
+            self.mode = "full"
+
+    async def wait_frame(self, clock):
+        """
+        Waits for the next frame and returns its dt in seconds.
+        """
+        if self.mode == "full":
+            return clock.tick(self.full_rate) / 1000.0
+        rate = self.hidden_rate if self.mode == "hidden" else self.idle_rate
+        deadline = self.last_wall + 1.0 / rate
+        while True:
+            remaining = deadline - time.perf_counter()
+            if remaining <= 0 or pygame.event.peek(self.WAKE_EVENTS):
+                break
+            await asyncio.sleep(min(remaining, 0.005))
+        if pygame.event.peek(self.WAKE_EVENTS):
+            self.still_frames = 0
+        return clock.tick() / 1000.0
+
+    def simulation_steps(self, dt):
+        # Number of simulation steps for a frame of length dt (1 unless the frame was throttled).
+        if self.mode == "full":
+            return 1
+        return max(1, math.ceil(dt * self.full_rate - 1e-9))
+
+    def report(self):
+        """
+        Per mode: frames presented, seconds spent and CPU usage (CPU seconds / wall seconds).
+        """
+        return {mode: {"frames": frames, "seconds": round(wall, 2),
+                       "cpu_percent": round(100.0 * cpu / wall, 1) if wall > 0 else 0.0}
+                for mode, (frames, wall, cpu) in self.stats.items() if frames}
+
+# --------------------
+# Rendering Backends
+# --------------------
+def resting_row(column):
+    # Row just below the lowest empty cell of a column: the panels from there down are
+    # supported all the way to the floor, so only a swap, a clear or a rise can move them.
+    try:
+        return len(column) - column[::-1].index(None)
+    except ValueError:
+        return 0
+
+class SurfaceBackend:
+    """
+    The original software path, drawn straight at the on-screen size: panel and preview
+    sprites are rendered once per cell size (rebuilt when the layout scale changes). Resting
+    panels are kept in a board layer surface that is blitted once per frame, so a frame only
+    copies sprites for the panels that can still move, animating panels and the upcoming rows
+    instead of one per visible cell.
+    """
+    def __init__(self, native_size):
+        # Create a borderless fullscreen window.
+        self.screen = pygame.display.set_mode(native_size, pygame.FULLSCREEN | pygame.NOFRAME, vsync=1)
+        pygame.display.set_caption("Tetris Attack Clone")
+        # Native-resolution sprites, scaled copies of them are made by sprites_for().
+        self.native_panels = []
+        self.native_previews = []
+        for color_index in range(len(PANEL_COLORS)):
+            sprite = pygame.Surface((PANEL_SIZE, PANEL_SIZE), pygame.SRCALPHA)
+            Panel(color_index, 0, 0).draw(sprite)
+            self.native_panels.append(sprite)
+            self.native_previews.append(render_preview_tile(color_index))
+        font_size = max(8, int(10 * PANEL_SIZE / 40))
+        self.native_clear_text, _ = pygame.freetype.SysFont("Arial", font_size, bold=True).render("CLEAR", (255, 215, 0))
+        self.cell_size = None
+        # Cached resting panels of the board drawn last (see update_layer).
+        self.layer = None
+        self.layer_board = None
+        self.layer_rises = 0
+        self.layer_floors = {}
+
+    def resize(self, native_size):
+        # Reinitialize the display mode with new dimensions.
+        self.screen = pygame.display.set_mode(native_size, pygame.RESIZABLE, vsync=1)
+
+    def sprites_for(self, cell_size):
+        # Panel, preview and "CLEAR" sprites at cell_size pixels per cell.
+        if cell_size != self.cell_size:
+            self.cell_size = cell_size
+            size = (cell_size, cell_size)
+            self.panel_sprites = [pygame.transform.smoothscale(s, size) for s in self.native_panels]
+            self.preview_sprites = [pygame.transform.smoothscale(s, size) for s in self.native_previews]
+            text_w, text_h = self.native_clear_text.get_size()
+            scale = cell_size / PANEL_SIZE
+            self.clear_text = pygame.transform.smoothscale(
+                self.native_clear_text, (max(1, round(text_w * scale)), max(1, round(text_h * scale))))
+
+    def update_layer(self, board, cell_size):
+        """
+        Brings the cached board layer up to date: every panel that rests (see resting_row)
+        at cell_size pixels per cell, leaving out animating panels. Only the columns the board
+        reports in redraw_columns, or whose resting part changed since the last frame, are
+        redrawn; a rise scrolls the layer up one cell. Returns the resting row per active column.
+        """
+        size = (board.cols * cell_size, board.rows * cell_size)
+        floors = {col: resting_row(board.grid[col]) for col in board.active_columns}
+        if self.layer is None or self.layer_board is not board or self.layer.get_size() != size:
+            self.layer = pygame.Surface(size, 0, self.screen)
+            self.layer_board = board
+            redraw = set(range(board.cols))
+        else:
+            risen = board.rise_count - self.layer_rises
+            if risen == 1:
+                # Everything moved up one row; only the new bottom row is missing.
+                self.layer.scroll(0, -cell_size)
+                y = (board.rows - 1) * cell_size
+                self.layer.fill(BG_COLOR, (0, y, size[0], cell_size))
+                self.layer.blits([(self.panel_sprites[column[-1].color_index], (col * cell_size, y))
+                                  for col, column in enumerate(board.grid)
+                                  if column[-1] is not None and column[-1] not in board.animating],
+                                 doreturn=False)
+                self.layer_floors = {col: max(0, floor - 1) for col, floor in self.layer_floors.items()}
+            redraw = set(range(board.cols)) if risen > 1 or risen < 0 else set(board.redraw_columns)
+            # Columns that became active or settled, or whose resting part grew or shrank.
+            redraw.update(col for col in self.layer_floors if col not in floors)
+            redraw.update(col for col, floor in floors.items() if self.layer_floors.get(col) != floor)
+        self.layer_rises = board.rise_count
+        self.layer_floors = floors
+        board.redraw_columns.clear()
+
+        batch = []
+        for col in redraw:
+            x = col * cell_size
+            self.layer.fill(BG_COLOR, (x, 0, cell_size, size[1]))
+            column = board.grid[col]
+            for row in range(floors.get(col, board.column_tops[col]), board.rows):
+                panel = column[row]
+                if panel is not None and panel not in board.animating:
+                    batch.append((self.panel_sprites[panel.color_index], (x, row * cell_size)))
+        self.layer.blits(batch, doreturn=False)
+        return floors
+
+    def draw_board(self, board, cursor, game_rect, scale):
+        # Resting panels come from the cached layer (see update_layer); the panels that can
+        # still move are drawn on top of it every frame. Their positions are computed in native
+        # game coordinates and mapped with scale.
+        screen = self.screen
+        left, top = game_rect.topleft
+        cell_size = max(1, round(PANEL_SIZE * scale))
+        self.sprites_for(cell_size)
+        floors = self.update_layer(board, cell_size)
+        screen.set_clip(game_rect)
+
+        rise_offset = board.rise_offset
+        rise_px = round(rise_offset * scale)
+        screen.blit(self.layer, (left, top - rise_px))
+
+        # Upcoming rows below the grid (translucent, so the background goes first).
+        y = top + board.rows * cell_size - rise_px
+        screen.fill(BG_COLOR, (left, y, board.cols * cell_size, 2 * cell_size))
+        batch = []
+        for row_colors in (board.upcoming_row, board.next_upcoming_row):
+            for col, color_index in enumerate(row_colors):
+                batch.append((self.preview_sprites[color_index], (left + col * cell_size, y)))
+            y += cell_size
+
+        # Panels that can still move (above the resting part of active columns) and animating ones.
+        panels = [panel for col, floor in floors.items()
+                  for panel in board.grid[col][board.column_tops[col]:floor]
+                  if panel is not None and panel not in board.animating]
+        panels.extend(board.animating)
+        panel_sprites = self.panel_sprites
+        for panel in panels:
+            x = panel.grid_x * PANEL_SIZE + panel.anim_offset[0]
+            y = panel.grid_y * PANEL_SIZE + panel.anim_offset[1]
+            if panel.state != PANEL_CLEARING:
+                batch.append((panel_sprites[panel.color_index], (left + round(x * scale), top + round(y * scale) - rise_px)))
+                continue
+            # Clearing panels shrink and fade (see Panel.draw).
+            progress = min(panel.anim_elapsed / panel.anim_duration, 1) if panel.anim_duration > 0 else 1
+            scale_factor = 1 - progress
+            new_size = max(1, int(PANEL_SIZE * scale_factor))
+            offset = (PANEL_SIZE - new_size) // 2
+            fade = 255 - int(255 * scale_factor)
+            color = PANEL_COLORS[panel.color_index]
+            screen.fill(tuple(min(c + fade, 255) for c in color),
+                        (left + round((x + offset) * scale), top + round((y + offset) * scale) - rise_px,
+                         max(1, round(new_size * scale)), max(1, round(new_size * scale))))
+            if new_size > 10:
+                text_w, text_h = self.clear_text.get_size()
+                batch.append((self.clear_text, (left + round((x + PANEL_SIZE / 2) * scale) - text_w // 2,
+                                                top + round((y + PANEL_SIZE / 2) * scale) - rise_px - text_h // 2)))
+        screen.blits(batch, doreturn=False)
+
+        # Cursor, kept on screen with a small margin at the left, right and top edges.
+        border_margin = max(2, int(PANEL_SIZE / 40 * 2))
+        cx = max(cursor.x * PANEL_SIZE, border_margin)
+        if cx + PANEL_SIZE * 2 + border_margin > board.cols * PANEL_SIZE:
+            cx = board.cols * PANEL_SIZE - PANEL_SIZE * 2 - border_margin
+        cy = max(cursor.y * PANEL_SIZE - rise_offset, border_margin)
+        thickness = max(1, round(max(1, int(PANEL_SIZE / 40 * 2)) * scale))
+        pygame.draw.rect(screen, CURSOR_COLOR, (left + round(cx * scale), top + round(cy * scale),
+                                                round(PANEL_SIZE * 2 * scale), round(PANEL_SIZE * scale)), thickness)
+        screen.set_clip(None)
+
+    def draw_frame(self, game):
+        screen = self.screen
+        game_rect, scale = game.compute_layout()
+
+        screen.fill((0, 0, 0))  # Clear the screen.
+        # Draw the retro-style scrolling background.
+        game.draw_background(screen)
+
+        # Draw the game area (board, upcoming rows and cursor) at its on-screen size.
+        self.draw_board(game.board, game.cursor, game_rect, scale)
+
+        # Draw a border around the gameplay area.
+        pygame.draw.rect(screen, (0, 0, 0), game_rect, 5)
+        inner_rect = game_rect.inflate(-8, -8)
+        pygame.draw.rect(screen, (255, 0, 0), inner_rect, 3)
+
+        # Draw the info panel (score and game info) just to the right.
+        info_x = game_rect.right + 10   # 10-pixel padding
+        info_y = game_rect.top
+        game.draw_info_panel(screen, info_x, info_y)
+
+        # Draw the controls panel on the left side.
+        # Move the controls panel further to the left (twice as much as before).
+        controls_x = game_rect.left - 360   # (panel width 200 + 260-pixel padding)
+        controls_y = game_rect.top
+        game.draw_controls_panel(screen, controls_x, controls_y)
+        pygame.display.update()
+
+class TextureBackend:
+    """
+    Hardware-accelerated path built on pygame._sdl2.video.
+    Panel sprites, preview tiles, the "CLEAR" overlay and the background pattern are uploaded
+    once as textures; every frame only issues scaled copies, so scaling and fading are done
+    by the renderer instead of transform.scale on a huge Surface.
+    Pass software=True to use SDL's software render driver (works without a GPU).
+    """
+    SIDE_PANEL_SIZE = (600, 200)  # native size of the info/controls text panels
+
+    def __init__(self, native_size, software=False):
+        from pygame._sdl2.video import Window, Renderer, Texture
+        self.Texture = Texture
+        self.window = Window("Tetris Attack Clone", size=native_size, fullscreen_desktop=True)
+        # accelerated=0 requests SDL's software renderer; -1 lets SDL pick the best driver.
+        self.renderer = Renderer(self.window, accelerated=0 if software else -1, vsync=not software)
+
+        # Panel sprites: one per color, rendered with the regular Panel drawing code.
+        self.panel_textures = []
+        self.preview_textures = []
+        for color_index in range(len(PANEL_COLORS)):
+            sprite = pygame.Surface((PANEL_SIZE, PANEL_SIZE), pygame.SRCALPHA)
+            Panel(color_index, 0, 0).draw(sprite)
+            self.panel_textures.append(Texture.from_surface(self.renderer, sprite))
+            self.preview_textures.append(Texture.from_surface(self.renderer, render_preview_tile(color_index)))
+
+        # Clearing panels are a flat square tinted with the fade color via color modulation.
+        white = pygame.Surface((1, 1))
+        white.fill((255, 255, 255))
+        self.flat_texture = Texture.from_surface(self.renderer, white)
+        font_size = max(8, int(10 * PANEL_SIZE / 40))
+        clear_font = pygame.freetype.SysFont("Arial", font_size, bold=True)
+        clear_surf, _ = clear_font.render("CLEAR", (255, 215, 0))
+        self.clear_text_texture = Texture.from_surface(self.renderer, clear_surf)
+
+        self.background_texture = None
+        self.background_size = None
+
+        # The info panel changes every frame and is streamed into one reusable texture;
+        # the controls panel is static and uploaded lazily on the first frame.
+        self.info_surface = pygame.Surface(self.SIDE_PANEL_SIZE, pygame.SRCALPHA)
+        self.info_texture = Texture(self.renderer, self.SIDE_PANEL_SIZE, streaming=True)
+        self.info_texture.blend_mode = 1  # SDL_BLENDMODE_BLEND
+        self.info_lines = None
+        self.controls_texture = None
+
+    def resize(self, native_size):
+        # The window keeps its own size; the background is rebuilt lazily for the new size.
+        self.background_texture = None
+
+    def build_background(self, native_size, spacing=50):
+        # Pre-render the diagonal pattern one spacing wider than the screen, so scrolling
+        # is a single copy shifted by background_offset.
+        width, height = native_size
+        pattern = pygame.Surface((width + spacing, height))
+        pattern.fill((10, 10, 10))
+        for i in range(-height - spacing, width + spacing, spacing):
+            pygame.draw.line(pattern, (40, 40, 40), (i, 0), (i + height, height), 2)
+        self.background_texture = self.Texture.from_surface(self.renderer, pattern)
+        self.background_size = native_size
+
+    def fill_frame(self, rect, color, thickness):
+        # Equivalent of pygame.draw.rect(..., width=thickness): a border drawn inside rect.
+        self.renderer.draw_color = color + (255,)
+        self.renderer.fill_rect((rect.x, rect.y, rect.w, thickness))
+        self.renderer.fill_rect((rect.x, rect.bottom - thickness, rect.w, thickness))
+        self.renderer.fill_rect((rect.x, rect.y, thickness, rect.h))
+        self.renderer.fill_rect((rect.right - thickness, rect.y, thickness, rect.h))
+
+    def draw_frame(self, game):
+        renderer = self.renderer
+        game_rect, scale = game.compute_layout()
+
+        def to_screen(x, y, w, h):
+            # Map a rectangle in native game coordinates to the viewport, rounding edges
+            # (not sizes) so that neighbouring panels never leave gaps.
+            left = round(x * scale)
+            top = round(y * scale)
+            return (left, top, round((x + w) * scale) - left, round((y + h) * scale) - top)
+
+        renderer.draw_color = (0, 0, 0, 255)
+        renderer.clear()
+        if self.background_texture is None or self.background_size != game.native_size:
+            self.build_background(game.native_size)
+        width, height = self.background_size
+        self.background_texture.draw(dstrect=(int(game.background_offset) - 50, 0, width + 50, height))
+
+        # Everything inside the game area is clipped by the viewport, like the game surface was.
+        renderer.set_viewport(game_rect)
+        renderer.draw_color = BG_COLOR + (255,)
+        renderer.fill_rect((0, 0, game_rect.w, game_rect.h))
+
+        board = game.board
+        for column in board.grid:
+            for panel in column:
+                if panel is None:
+                    continue
+                x = panel.grid_x * PANEL_SIZE + panel.anim_offset[0]
+                y = panel.grid_y * PANEL_SIZE + panel.anim_offset[1] - board.rise_offset
+                if panel.state == PANEL_CLEARING:
+                    progress = 1
+                    if panel.anim_duration > 0:
+                        progress = min(panel.anim_elapsed / panel.anim_duration, 1)
+                    scale_factor = 1 - progress
+                    new_size = max(1, int(PANEL_SIZE * scale_factor))
+                    offset = (PANEL_SIZE - new_size) // 2
+                    fade = 255 - int(255 * scale_factor)
+                    color = PANEL_COLORS[panel.color_index]
+                    self.flat_texture.color = tuple(min(c + fade, 255) for c in color)
+                    self.flat_texture.draw(dstrect=to_screen(x + offset, y + offset, new_size, new_size))
+                    if new_size > 10:
+                        text_w, text_h = self.clear_text_texture.width, self.clear_text_texture.height
+                        self.clear_text_texture.draw(dstrect=to_screen(
+                            x + (PANEL_SIZE - text_w) // 2, y + (PANEL_SIZE - text_h) // 2, text_w, text_h))
+                    continue
+                self.panel_textures[panel.color_index].draw(dstrect=to_screen(x, y, PANEL_SIZE, PANEL_SIZE))
+
+        base_y = board.rows * PANEL_SIZE - board.rise_offset
+        for row_index, row_colors in enumerate((board.upcoming_row, board.next_upcoming_row)):
+            for col in range(board.cols):
+                self.preview_textures[row_colors[col]].draw(
+                    dstrect=to_screen(col * PANEL_SIZE, base_y + row_index * PANEL_SIZE, PANEL_SIZE, PANEL_SIZE))
+
+        # Cursor, kept on screen with a small margin at the left, right and top edges.
+        cursor = game.cursor
         border_margin = max(2, int(PANEL_SIZE / 40 * 2))
-        # Ensure the cursor is not drawn off the left edge.
-        x = max(x, border_margin)
-        # Ensure the cursor is not drawn off the right edge.
-        if x + PANEL_SIZE * 2 + border_margin > GRID_COLS * PANEL_SIZE:
-            x = GRID_COLS * PANEL_SIZE - PANEL_SIZE * 2 - border_margin
-        # Ensure the cursor is not drawn off the top edge.
-        y = max(y, border_margin)
-        thickness = max(1, int(PANEL_SIZE / 40 * 2))
-        pygame.draw.rect(surface, CURSOR_COLOR, (x, y, PANEL_SIZE * 2, PANEL_SIZE), thickness)
+        cx = max(cursor.x * PANEL_SIZE, border_margin)
+        if cx + PANEL_SIZE * 2 + border_margin > board.cols * PANEL_SIZE:
+            cx = board.cols * PANEL_SIZE - PANEL_SIZE * 2 - border_margin
+        cy = max(cursor.y * PANEL_SIZE - board.rise_offset, border_margin)
+        thickness = max(1, round(max(1, int(PANEL_SIZE / 40 * 2)) * scale))
+        self.fill_frame(pygame.Rect(to_screen(cx, cy, PANEL_SIZE * 2, PANEL_SIZE)), CURSOR_COLOR, thickness)
+
+        renderer.set_viewport(None)
+
+        # Draw a border around the gameplay area.
+        self.fill_frame(game_rect, (0, 0, 0), 5)
+        self.fill_frame(game_rect.inflate(-8, -8), (255, 0, 0), 3)
+
+        # Info panel on the right, controls panel on the left.
+        # The info texture is only re-uploaded when one of its displayed lines changes.
+        panel_w, panel_h = self.SIDE_PANEL_SIZE
+        info_lines = game.info_lines()
+        if info_lines != self.info_lines:
+            self.info_lines = info_lines
+            self.info_surface.fill((0, 0, 0, 0))
+            game.draw_info_panel(self.info_surface, 0, 0)
+            self.info_texture.update(self.info_surface)
+        self.info_texture.draw(dstrect=(game_rect.right + 10, game_rect.top, panel_w, panel_h))
+        if self.controls_texture is None:
+            self.controls_texture = self.Texture.from_surface(renderer, game.get_controls_surface())
+        self.controls_texture.draw(dstrect=(game_rect.left - 360, game_rect.top,
+                                            self.controls_texture.width, self.controls_texture.height))
+
+        renderer.present()
 
 # --------------------
-# Game Class
+# Audio
 # --------------------
-class Game:
-    def __init__(self):
-        pygame.mixer.set_num_channels(16)
+class AudioEngine:
+    """
+    Owns mixer setup and sound effects.
+    Swap and chain sounds each have a reserved channel so they never compete with vanish
+    sounds; vanish sounds share the remaining voices and, once all are busy, the newest
+    vanish sound steals the channel of the oldest one instead of being dropped.
+    Every vanish sound also records an estimate of its latency: how far the clearing animation
+    was already ahead in game time, plus the time since the start of the frame, plus the
+    nominal mixer buffer (buffer / frequency). The device's own output latency is unknown
+    to SDL_mixer, so this is not a measurement of when the sound is heard.
+    """
+    RESERVED_CHANNELS = 2  # 0: swap, 1: chain
+
+    def __init__(self, frequency, buffer, voices):
+        if voices <= self.RESERVED_CHANNELS:
+            raise ValueError("Need at least %d mixer channels (swap, chain and one vanish voice), got %d"
+                             % (self.RESERVED_CHANNELS + 1, voices))
+        # pygame.init() already opened the mixer with default settings; reopen it with ours.
+        pygame.mixer.quit()
+        pygame.mixer.pre_init(frequency=frequency, size=-16, channels=2, buffer=buffer)
+        pygame.mixer.init()
+        self.frequency = pygame.mixer.get_init()[0]
+        self.buffer_latency = buffer / self.frequency
+        pygame.mixer.set_num_channels(voices)
+        pygame.mixer.set_reserved(self.RESERVED_CHANNELS)
+        self.swap_channel = pygame.mixer.Channel(0)
+        self.chain_channel = pygame.mixer.Channel(1)
+        self.vanish_channels = [pygame.mixer.Channel(i) for i in range(self.RESERVED_CHANNELS, voices)]
+        self.vanish_started = [0.0] * len(self.vanish_channels)
 
         # Load sound effects.
         self.swap_sound = pygame.mixer.Sound("swap.wav")
@@ -715,6 +1629,87 @@ class Game:
             new_sound.set_volume(0.1)  # Ensure the pitch-shifted vanish sound is set to 20% volume
             self.vanish_sounds.append(new_sound)
 
+        # Latency diagnostics (seconds), bounded to the most recent samples.
+        self.frame_start = time.perf_counter()
+        self.latencies = deque(maxlen=4096)
+        self.stolen = 0
+
+    def begin_frame(self):
+        # Called once per frame, right after the clock tick.
+        self.frame_start = time.perf_counter()
+
+    def play_swap(self):
+        self.swap_channel.play(self.swap_sound)
+
+    def play_chain(self):
+        self.chain_channel.play(self.chain_sound)
+
+    def play_vanish(self, index, late=0.0):
+        now = time.perf_counter()
+        # Prefer an idle voice; otherwise steal the one whose sound started first.
+        for voice, channel in enumerate(self.vanish_channels):
+            if not channel.get_busy():
+                break
+        else:
+            voice = self.vanish_started.index(min(self.vanish_started))
+            self.stolen += 1
+        self.vanish_channels[voice].play(self.vanish_sounds[index])
+        self.vanish_started[voice] = now
+        self.latencies.append(late + (now - self.frame_start) + self.buffer_latency)
+
+    def latency_report(self):
+        """
+        Summarizes the estimated vanish latencies in milliseconds (scheduling delay plus a
+        constant buffer_ms term; see the class docstring).
+        """
+        if not self.latencies:
+            return {"samples": 0, "stolen": self.stolen, "buffer_ms": round(self.buffer_latency * 1000, 2)}
+        latency_ms = np.asarray(self.latencies) * 1000.0
+        return {
+            "samples": int(latency_ms.size),
+            "mean_ms": round(float(latency_ms.mean()), 2),
+            "p95_ms": round(float(np.percentile(latency_ms, 95)), 2),
+            "max_ms": round(float(latency_ms.max()), 2),
+            "buffer_ms": round(self.buffer_latency * 1000, 2),
+            "stolen": self.stolen,
+        }
+
+# --------------------
+# Text Cache
+# --------------------
+class TextCache:
+    """
+    Caches rendered text surfaces keyed by (text, color).
+    Once more than max_entries surfaces are cached, the least recently used one is evicted.
+    """
+    def __init__(self, font, max_entries=64):
+        self.font = font
+        self.max_entries = max_entries
+        self.entries = OrderedDict()
+
+    def render(self, text, color):
+        key = (text, color)
+        surf = self.entries.get(key)
+        if surf is not None:
+            self.entries.move_to_end(key)
+            return surf
+        surf, _ = self.font.render(text, color)
+        self.entries[key] = surf
+        if len(self.entries) > self.max_entries:
+            self.entries.popitem(last=False)
+        return surf
+
+# --------------------
+# Game Class
+# --------------------
+class Game:
+    def __init__(self, renderer_backend=RENDERER_BACKEND, software_render=False, telemetry=None,
+                 audio_config=AUDIO_PRESETS[AUDIO_PRESET], audio_diagnostics=False, replay_path=None,
+                 throttle=True, frame_stats=False, grid_size=(GRID_COLS, GRID_ROWS),
+                 filled_rows=FILLED_ROWS, danger_rows=DANGER_ROWS, netplay=None):
+        self.audio = AudioEngine(**audio_config)
+        self.audio_diagnostics = audio_diagnostics
+
         # Background music tracks.
         self.bg_normal = "bg_normal.ogg"
         self.bg_danger = "bg_danger.ogg"
@@ -729,97 +1724,126 @@ class Game:
         # Get current screen resolution for fullscreen.
         info = pygame.display.Info()
         self.native_size = (info.current_w, info.current_h)
-        # Create a borderless fullscreen window.
-        self.screen = pygame.display.set_mode(self.native_size, pygame.FULLSCREEN | pygame.NOFRAME, vsync=1)
-        pygame.display.set_caption("Tetris Attack Clone")
+        if renderer_backend == "texture":
+            self.backend = TextureBackend(self.native_size, software=software_render)
+            # The desktop-fullscreen window may not match the reported display mode.
+            self.native_size = self.backend.window.size
+        else:
+            self.backend = SurfaceBackend(self.native_size)
         self.clock = pygame.time.Clock()
-        self.board = Board()
+        self.frame_stats = frame_stats
+        # Optional versus game (see netplay.py): the session owns both boards and the
+        # fixed-step simulation; this game shows and controls the local one.
+        self.netplay = netplay
+        if netplay is not None:
+            self.board = netplay.local_board
+            self.cursor = netplay.cursors[netplay.local_player]
+            throttle = False  # the opponent keeps playing while this window is idle
+        else:
+            cols, rows = grid_size
+            self.board = Board(cols=cols, rows=rows, filled_rows=filled_rows)
+            self.cursor = Cursor(cols, rows)
+        self.danger_rows = danger_rows
         # NEW: Query the desktop refresh rate (requires pygame 2). If not available, default to 60.
         try:
             desktop_mode = pygame.display.get_desktop_display_mode()
             self.refresh_rate = desktop_mode.refresh_rate
         except Exception:
             self.refresh_rate = 144
+        if not self.refresh_rate or self.refresh_rate <= 0:
+            # Some drivers (Wayland, dummy) report 0 for an unknown rate.
+            self.refresh_rate = 60
         print("Using refresh rate:", self.refresh_rate)
-        self.board.swap_sound = self.swap_sound
-        self.board.chain_sound = self.chain_sound
-        # NEW: Provide the precomputed vanish sounds to the board.
-        self.board.vanish_sounds = self.vanish_sounds
-        self.cursor = Cursor()
+        self.scheduler = FrameScheduler(self.refresh_rate, enabled=throttle)
+        # NEW: Provide the sound effects (and their voice allocation) to the board.
+        self.board.audio = self.audio
+        self.telemetry = telemetry
+        self.board.telemetry = telemetry
         self.native_surface = pygame.Surface(self.native_size)
         self.info_font = pygame.freetype.SysFont("Arial", 28)
+        # Rendered text is cached; the static controls block is composited once on first use.
+        self.text_cache = TextCache(self.info_font)
+        self.controls_surface = None
 
         # Timers for falling delay progression & difficulty
         self.difficulty_timer = 0  # increments with game time
 
         self.total_time = 0  # elapsed game time (in seconds)
+        # Optional replay recording (see replay.py); takes its first keyframe right away.
+        self.recorder = None
+        if replay_path and netplay is not None:
+            print("Replays of versus games are not supported; not recording.")
+        elif replay_path:
+            self.recorder = ReplayRecorder(replay_path, self)
         # New background offset for retro diagonal scrolling pattern.
         self.background_offset = 0
 
     async def run(self):
         running = True
+        game_over_cause = "quit"
+        if self.telemetry is not None:
+            # Telemetry is flushed by its own task, never from inside a frame.
+            self.telemetry.record("session_start", grid_cols=self.board.cols, grid_rows=self.board.rows,
+                                  refresh_rate=self.refresh_rate)
+            flusher = asyncio.create_task(self.telemetry.run_flusher())
         while running:
-            dt = self.clock.tick(self.refresh_rate) / 1000.0  # Ticking at the monitor's refresh rate
+            # Ticking at the monitor's refresh rate, or lower while idle/unfocused (see FrameScheduler).
+            dt = await self.scheduler.wait_frame(self.clock)
             await asyncio.sleep(0)  # NEW: required for pygbag compatibility
+            self.audio.begin_frame()
+            if self.telemetry is not None:
+                self.telemetry.tick(dt, self.board.score)
 
             # Check if left Shift is held; if so, set shift_pressed True (rising speed capped to 2 sec per cell).
             keys = pygame.key.get_pressed()
             shift_pressed = keys[pygame.K_LSHIFT]
 
-            self.total_time += dt
-            self.difficulty_timer += dt
-
-            # Increase difficulty every 30 seconds
-            if self.difficulty_timer >= 30:
-                self.difficulty_timer -= 30
-                # Decrease falling delay but not below min
-                self.board.current_fall_delay = max(FALL_DELAY_MIN, self.board.current_fall_delay - 0.01)
-                # Decrease chain delays (base and incremental) with minimum base delay check
-                self.board.current_chain_base_delay = max(CHAIN_BASE_DELAY_MIN, self.board.current_chain_base_delay - 0.02)
-                self.board.current_chain_incremental_delay = max(0, self.board.current_chain_incremental_delay - 0.01)
-
-            # Event handling
+            # Event handling: gameplay keys become actions, applied in order by advance_frame.
+            actions = []
             for event in pygame.event.get():
+                self.scheduler.observe_event(event)
                 if event.type == pygame.QUIT:
                     running = False
                 elif event.type == pygame.KEYDOWN:
                     if event.key == pygame.K_ESCAPE:
                         running = False
-                    elif self.board.swap_lockout_timer <= 0:
-                        # Move cursor using either arrow keys or WASD
-                        if event.key in (pygame.K_LEFT, pygame.K_a):
-                            self.cursor.move(-1, 0)
-                        elif event.key in (pygame.K_RIGHT, pygame.K_d):
-                            self.cursor.move(1, 0)
-                        elif event.key in (pygame.K_UP, pygame.K_w):
-                            self.cursor.move(0, -1)
-                        elif event.key in (pygame.K_DOWN, pygame.K_s):
-                            self.cursor.move(0, 1)
-                        elif event.key in (pygame.K_SPACE, pygame.K_RETURN):
-                            # When swapping, swap the panel under the cursor with the one to its right
-                            self.board.do_swap(self.cursor.x, self.cursor.y)
-                elif event.type == pygame.VIDEORESIZE:
-                    # Update native_size and reinitialize the display mode with new dimensions.
-                    self.native_size = (event.w, event.h)
-                    self.screen = pygame.display.set_mode(self.native_size, pygame.RESIZABLE, vsync=1)
-
-            # Update game mechanics
-            self.board.update(dt, shift_pressed)
-            # If a full cell rise occurred, adjust the cursor upward to follow the blocks.
-            if self.board.risen_this_frame:
-                self.cursor.y = max(self.cursor.y - 1, 0)
+                    elif event.key in KEY_ACTIONS:
+                        actions.append(KEY_ACTIONS[event.key])
+                elif event.type in (pygame.VIDEORESIZE, pygame.WINDOWSIZECHANGED):
+                    # Update native_size and let the backend adapt to the new dimensions.
+                    # A resize usually arrives as both events; only the first one does the work.
+                    size = (event.w, event.h) if event.type == pygame.VIDEORESIZE else (event.x, event.y)
+                    if size != tuple(self.native_size):
+                        self.native_size = size
+                        self.backend.resize(self.native_size)
+
+            if self.netplay is not None:
+                # Versus: fixed steps, rolled back and replayed when the opponent's input arrives late.
+                self.total_time += dt
+                self.netplay.run_for(dt, shift_pressed, actions)
+            else:
+                # Update game mechanics. A throttled frame covers more time than a full-rate one, so it is
+                # simulated in steps no longer than a full-rate frame (input goes into the first step).
+                steps = self.scheduler.simulation_steps(dt)
+                step_dt = dt / steps
+                for step in range(steps):
+                    step_actions = actions if step == 0 else []
+                    self.total_time += step_dt
+                    # Increase difficulty every 30 seconds
+                    self.difficulty_timer = advance_difficulty(self.board, self.difficulty_timer + step_dt)
+                    advance_frame(self.board, self.cursor, step_dt, shift_pressed, step_actions)
+                    if self.recorder is not None:
+                        self.recorder.record_frame(step_dt, shift_pressed, step_actions, self)
+                    if self.board.top_row_timer >= GAME_OVER_TIME:
+                        break
+            self.scheduler.end_frame(self, had_input=bool(actions))
 
             # Background music switching based on block height.
-            # Safe zone: blocks with grid_y >= (GRID_ROWS - 8). Danger if any block has grid_y < (GRID_ROWS - 8).
-            danger = False
-            for col in range(GRID_COLS):
-                for row in range(GRID_ROWS):
-                    panel = self.board.grid[col][row]
-                    if panel is not None and panel.grid_y < (GRID_ROWS - 8):
-                        danger = True
-                        break
-                if danger:
-                    break
+            # Danger if any block is within the top danger_rows rows (the board tracks its column tops).
+            danger = self.board.top_panel_row() < self.danger_rows
+
+            if self.telemetry is not None and danger != (self.current_bg == "danger"):
+                self.telemetry.record("danger", active=danger, score=self.board.score)
 
             if danger and self.current_bg != "danger":
                 pygame.mixer.music.load(self.bg_danger)
@@ -832,116 +1856,132 @@ class Game:
                 pygame.mixer.music.play(-1)
                 self.current_bg = "normal"
 
-            # Check for game over condition: if any panel occupies the top row for 3 or more seconds.
-            if self.board.top_row_timer >= 3:
+            # Check for game over condition: if any panel occupies the top row for GAME_OVER_TIME or more seconds.
+            if self.board.top_row_timer >= GAME_OVER_TIME:
+                running = False
+                game_over_cause = "top_row"
+                continue
+            if self.netplay is not None and self.netplay.result() is not None:
+                # The opponent topped out, quit or stopped answering.
                 running = False
+                game_over_cause = self.netplay.result()
+                print("Game over:", game_over_cause.replace("_", " "))
                 continue
 
-            # Create a separate game surface representing the actual game area.
-            # Define native game area dimensions: width = GRID_COLS * PANEL_SIZE,
-            # height = GRID_ROWS * PANEL_SIZE + PANEL_SIZE (including the upcoming row preview).
-            game_width = GRID_COLS * PANEL_SIZE
-            game_height = GRID_ROWS * PANEL_SIZE + PANEL_SIZE
-            game_surface = pygame.Surface((game_width, game_height))
-            game_surface.fill(BG_COLOR)
-
-            # Draw the game: board, cursor, and score.
-            self.board.draw(game_surface)
-            self.cursor.draw(game_surface, offset_y=self.board.rise_offset)
-            
-            # Reserve space for an info panel on the right and controls panel on the left.
-            info_panel_width = 200
-            vertical_margin = 100
-            available_width = self.native_size[0] - info_panel_width
-            available_height = self.native_size[1] - vertical_margin
-            scale_factor = min(available_width / game_width, available_height / game_height)
-            scaled_width = int(game_width * scale_factor)
-            scaled_height = int(game_height * scale_factor)
-            x_offset = (available_width - scaled_width) // 2
-            y_offset = vertical_margin // 2
-
-            self.screen.fill((0, 0, 0))  # Clear the screen.
-            # Draw the retro-style scrolling background.
-            self.draw_background(self.screen)
-
-            # Scale the game_surface and draw it at computed offset.
-            scaled_game_surface = pygame.transform.scale(game_surface, (scaled_width, scaled_height))
-            self.screen.blit(scaled_game_surface, (x_offset, y_offset))
-
-            # Draw a border around the gameplay area.
-            game_rect = pygame.Rect(x_offset, y_offset, scaled_width, scaled_height)
-            pygame.draw.rect(self.screen, (0, 0, 0), game_rect, 5)
-            inner_rect = game_rect.inflate(-8, -8)
-            pygame.draw.rect(self.screen, (255, 0, 0), inner_rect, 3)
-
-            # Draw the info panel (score and game info) just to the right.
-            info_x = x_offset + scaled_width + 10   # 10-pixel padding
-            info_y = y_offset
-            self.draw_info_panel(self.screen, info_x, info_y)
-
-            # Draw the controls panel on the left side.
-            # Move the controls panel further to the left (twice as much as before).
-            controls_x = x_offset - 360   # (panel width 200 + 260-pixel padding)
-            controls_y = y_offset
-            self.draw_controls_panel(self.screen, controls_x, controls_y)
-
-            pygame.display.update()
+            self.backend.draw_frame(self)
 
             # Update background offset for scrolling effect (diagonal speed 30 pixels per second).
             self.background_offset += 30 * dt
             # Wrap around the spacing (here 50 pixels).
             self.background_offset %= 50
 
+        if self.telemetry is not None:
+            await self.telemetry.close(game_over_cause, self.board.score)
+            flusher.cancel()
+        if self.audio_diagnostics:
+            print("Estimated audio latency:", self.audio.latency_report())
+        if self.recorder is not None:
+            self.recorder.close()
+        if self.frame_stats:
+            print("Frame scheduling:", self.scheduler.report())
+        if self.netplay is not None:
+            print("Netplay:", self.netplay.report())
+            self.netplay.close()
         pygame.quit()
         sys.exit()
 
-    def draw_info_panel(self, target_surface, panel_x, panel_y):
-        # panel_x and panel_y position the info panel on the right.
-        line_spacing = 40
-        
-        # Render Score
-        score_surf, _ = self.info_font.render("Score: " + str(self.board.score), (255,255,255))
-        target_surface.blit(score_surf, (panel_x, panel_y))
-        panel_y += line_spacing
-        
-        # Render Time
-        time_surf, _ = self.info_font.render("Time: " + f"{self.total_time:.1f}s", (255,255,255))
-        target_surface.blit(time_surf, (panel_x, panel_y))
-        panel_y += line_spacing
-        
-        # Render Block Speed as a discrete level from 1 to 10.
+    def compute_layout(self):
+        """
+        Returns the on-screen rectangle of the scaled game area and its scale factor.
+        Space is reserved for an info panel on the right and controls panel on the left.
+        """
+        game_width = self.board.cols * PANEL_SIZE
+        game_height = self.board.rows * PANEL_SIZE + PANEL_SIZE
+        info_panel_width = 200
+        vertical_margin = 100
+        available_width = self.native_size[0] - info_panel_width
+        available_height = self.native_size[1] - vertical_margin
+        scale_factor = min(available_width / game_width, available_height / game_height)
+        # Round down to whole pixels per cell, so every row and column starts on a pixel
+        # boundary (the Surface backend scrolls its cached panels by exactly one cell).
+        cell_size = max(1, int(PANEL_SIZE * scale_factor))
+        scale_factor = cell_size / PANEL_SIZE
+        scaled_width = self.board.cols * cell_size
+        scaled_height = (self.board.rows + 1) * cell_size
+        x_offset = (available_width - scaled_width) // 2
+        y_offset = vertical_margin // 2
+        return pygame.Rect(x_offset, y_offset, scaled_width, scaled_height), scale_factor
+
+    def info_lines(self):
+        """
+        Returns the (text, color) lines shown in the info panel. Values are formatted at their
+        displayed precision, so a line only changes (and is only re-rendered) when what the
+        player sees changes, e.g. the time every 0.1 s.
+        """
+        lines = [
+            ("Score: " + str(self.board.score), (255,255,255)),
+            ("Time: " + f"{self.total_time:.1f}s", (255,255,255)),
+        ]
+
+        # Block Speed as a discrete level from 1 to 10.
         speed_range = BASE_FALL_DELAY - FALL_DELAY_MIN
         if speed_range != 0:
             level = round(((BASE_FALL_DELAY - self.board.current_fall_delay) / speed_range) * 9) + 1
         else:
             level = 10
         level = max(1, min(level, 10))
-        speed_text = f"Block Speed: {level} | 10"
-        speed_surf, _ = self.info_font.render(speed_text, (255,255,255))
-        target_surface.blit(speed_surf, (panel_x, panel_y))
-        panel_y += line_spacing
-        
-        # Render Game Over Countdown (only if active)
+        lines.append((f"Block Speed: {level} | 10", (255,255,255)))
+
+        status = self.netplay_status()
+        if status is not None:
+            opponent_score, confirmed_frame, frame, rollbacks = status
+            lines.append(("Opponent: " + str(opponent_score), (255,255,255)))
+            # Frames simulated on predicted opponent input (rolled back if the prediction was wrong).
+            lines.append((f"Net: {max(0, frame - 1 - confirmed_frame)} ahead | {rollbacks} rollbacks", (255,255,255)))
+
+        # Game Over Countdown (only if active)
         if self.board.top_row_timer > 0:
             countdown = max(0, 3 - self.board.top_row_timer)
-            go_surf, _ = self.info_font.render("Game Over in: " + f"{countdown:.1f}s", (255,0,0))
-            target_surface.blit(go_surf, (panel_x, panel_y))
+            lines.append(("Game Over in: " + f"{countdown:.1f}s", (255,0,0)))
+        return lines
 
-    def draw_controls_panel(self, target_surface, panel_x, panel_y):
-        # Draw control instructions using the same info font.
+    def netplay_status(self):
+        # (opponent score, last confirmed frame, current frame, rollbacks) in versus games, else None.
+        if self.netplay is None:
+            return None
+        return (self.netplay.remote_board.score, self.netplay.remote_confirmed, self.netplay.frame,
+                self.netplay.stats.rollbacks)
+
+    def draw_info_panel(self, target_surface, panel_x, panel_y):
+        # panel_x and panel_y position the info panel on the right.
         line_spacing = 40
-        controls = [
-            "Controls:",
-            "Arrow Keys / WASD: Move",
-            "Enter/Space: Swap Blocks",
-            "Left Shift: Fast Rise",
-            "Esc: Quit"
-        ]
-        for line in controls:
-            text_surf, _ = self.info_font.render(line, (255,255,255))
-            target_surface.blit(text_surf, (panel_x, panel_y))
+        for text, color in self.info_lines():
+            target_surface.blit(self.text_cache.render(text, color), (panel_x, panel_y))
             panel_y += line_spacing
 
+    def get_controls_surface(self):
+        # The control instructions never change: composite them into one surface once.
+        if self.controls_surface is None:
+            line_spacing = 40
+            controls = [
+                "Controls:",
+                "Arrow Keys / WASD: Move",
+                "Enter/Space: Swap Blocks",
+                "Left Shift: Fast Rise",
+                "Esc: Quit"
+            ]
+            rendered = [self.info_font.render(line, (255,255,255))[0] for line in controls]
+            width = max(surf.get_width() for surf in rendered)
+            height = line_spacing * (len(rendered) - 1) + rendered[-1].get_height()
+            self.controls_surface = pygame.Surface((width, height), pygame.SRCALPHA)
+            for i, surf in enumerate(rendered):
+                self.controls_surface.blit(surf, (0, i * line_spacing))
+        return self.controls_surface
+
+    def draw_controls_panel(self, target_surface, panel_x, panel_y):
+        # Draw control instructions using the same info font (pre-composited).
+        target_surface.blit(self.get_controls_surface(), (panel_x, panel_y))
+
     def draw_background(self, target_surface):
         """
         Draws a retro-style background with diagonally scrolling lines.
@@ -981,9 +2021,106 @@ def pitch_shift_sound(sound_array, pitch_factor):
 # Main Loop
 # --------------------
 
+def parse_audio_voices(text):
+    # Swap and chain have a channel each; vanish sounds need at least one more.
+    import argparse
+    try:
+        voices = int(text)
+    except ValueError:
+        raise argparse.ArgumentTypeError("expected a number of channels")
+    if voices < AudioEngine.RESERVED_CHANNELS + 1:
+        raise argparse.ArgumentTypeError("need at least %d channels" % (AudioEngine.RESERVED_CHANNELS + 1))
+    return voices
+
+def parse_grid_size(text):
+    # "32x64" -> (32, 64)
+    import argparse
+    try:
+        cols, rows = (int(part) for part in text.lower().split("x"))
+    except ValueError:
+        raise argparse.ArgumentTypeError("expected COLSxROWS, e.g. 32x64")
+    # Same bounds as Board.
+    try:
+        check_grid_size(cols, rows)
+    except ValueError as exc:
+        raise argparse.ArgumentTypeError(str(exc))
+    return cols, rows
+
+def parse_address(text):
+    # "example.org:7000" -> ("example.org", 7000)
+    import argparse
+    host, _, port = text.rpartition(":")
+    if not host or not port.isdigit():
+        raise argparse.ArgumentTypeError("expected HOST:PORT, e.g. 192.168.1.20:7000")
+    return host, int(port)
+
+def parse_args(argv):
+    # Startup options; unknown arguments are ignored (pygbag may pass its own).
+    import argparse
+    parser = argparse.ArgumentParser(description="Tetris Attack Clone")
+    parser.add_argument("--renderer", choices=("surface", "texture"), default=RENDERER_BACKEND,
+                        help="drawing backend: software Surfaces or SDL renderer textures")
+    parser.add_argument("--render-driver", choices=("auto", "software"), default="auto",
+                        help="SDL render driver for the texture backend")
+    parser.add_argument("--audio-preset", choices=sorted(AUDIO_PRESETS), default=AUDIO_PRESET,
+                        help="mixer frequency/buffer/voice preset")
+    parser.add_argument("--audio-buffer", type=int, help="override the preset mixer buffer size (samples)")
+    parser.add_argument("--audio-frequency", type=int, help="override the preset mixer frequency (Hz)")
+    parser.add_argument("--audio-voices", type=parse_audio_voices,
+                        help="override the preset number of mixer channels (at least %d)" % (AudioEngine.RESERVED_CHANNELS + 1))
+    parser.add_argument("--audio-diagnostics", action="store_true",
+                        help="print estimated sound effect latency on exit")
+    parser.add_argument("--no-throttle", action="store_true",
+                        help="always render at the full refresh rate, even when idle or unfocused")
+    parser.add_argument("--frame-stats", action="store_true",
+                        help="print time and CPU spent per frame-rate mode on exit")
+    parser.add_argument("--grid", metavar="COLSxROWS", type=parse_grid_size, default=(GRID_COLS, GRID_ROWS),
+                        help="board size in cells, e.g. 32x64 (default %dx%d)" % (GRID_COLS, GRID_ROWS))
+    parser.add_argument("--filled-rows", type=int, default=FILLED_ROWS,
+                        help="rows filled with blocks at the start")
+    parser.add_argument("--danger-rows", type=int, default=DANGER_ROWS,
+                        help="switch to the danger music when blocks reach this many rows from the top")
+    parser.add_argument("--host", metavar="PORT", type=int, default=None,
+                        help="host a versus game on this UDP port and wait for a player to join")
+    parser.add_argument("--join", metavar="HOST:PORT", type=parse_address, default=None,
+                        help="join a versus game hosted at HOST:PORT")
+    parser.add_argument("--input-delay", type=int, default=2,
+                        help="frames of local input delay in versus games (hides latency, fewer rollbacks)")
+    parser.add_argument("--record", metavar="PATH", default=None,
+                        help="record a seekable replay of this session to PATH")
+    parser.add_argument("--telemetry", metavar="PATH", default=None,
+                        help="append a JSONL telemetry stream for this session to PATH")
+    args, _ = parser.parse_known_args(argv)
+    try:
+        check_grid_size(args.grid[0], args.grid[1], args.filled_rows)
+    except ValueError as exc:
+        parser.error("--filled-rows: %s" % exc)
+    if args.input_delay < 0:
+        parser.error("--input-delay must be 0 or more frames")
+    return args
+
 async def main():
     # Encapsulate initialization and the game loop in main() for pygbag.
-    game = Game()
+    args = parse_args(sys.argv[1:])
+    telemetry = SessionTelemetry(args.telemetry) if args.telemetry else None
+    audio_config = dict(AUDIO_PRESETS[args.audio_preset])
+    for key in ("buffer", "frequency", "voices"):
+        if getattr(args, "audio_" + key) is not None:
+            audio_config[key] = getattr(args, "audio_" + key)
+    session = None
+    if args.host is not None or args.join is not None:
+        import netplay
+        print("Waiting for the other player..." if args.join is None else "Connecting...")
+        session = netplay.connect(args.host, args.join, cols=args.grid[0], rows=args.grid[1],
+                                  filled_rows=args.filled_rows, input_delay=args.input_delay)
+    game = Game(renderer_backend=args.renderer, software_render=args.render_driver == "software",
+                telemetry=telemetry, audio_config=audio_config, audio_diagnostics=args.audio_diagnostics,
+                replay_path=args.record, throttle=not args.no_throttle, frame_stats=args.frame_stats,
+                grid_size=args.grid, filled_rows=args.filled_rows,
+                danger_rows=args.danger_rows, netplay=session)
     await game.run()
 
-asyncio.run(main())  # NEW: run the asynchronous main loop
\ No newline at end of file
+if __name__ == "__main__":
+    # Modules that import main (netplay.py) must share this module, not load a second copy.
+    sys.modules.setdefault("main", sys.modules[__name__])
+    asyncio.run(main())  # NEW: run the asynchronous main loop
\ No newline at end of file
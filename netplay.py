@@ -0,0 +1,569 @@
+import argparse
+import heapq
+import random
+import socket
+import struct
+import sys
+import time
+import zlib
+from main import (
+    Board, Cursor, advance_frame, advance_difficulty, GRID_COLS, GRID_ROWS, FILLED_ROWS,
+    GAME_OVER_TIME, ACTION_LEFT, ACTION_SWAP,
+)
+
+# --------------------
+# Rollback Netplay
+# --------------------
+# Two players, each with their own board, run the same deterministic simulation of both boards
+# at a fixed step. Only inputs cross the network. Local input is applied right away (after
+# input_delay frames); missing remote input is predicted (Left Shift held as before, no key
+# presses). When the real input arrives and differs from the prediction, the session restores
+# the remote board as saved before that frame (Board.snapshot/restore) and simulates it forward
+# again. The boards do not affect each other, so the local board is never rolled back.
+#
+# Every packet is a UDP datagram (little-endian):
+#   HELLO/WELCOME   HANDSHAKE: the joiner says hello, the host answers with seed and grid size
+#   INPUT           INPUT_HEADER, then the sender's inputs for frames first..first+count-1:
+#                   one byte per frame (bit 7: Left Shift, bits 0-6: number of actions)
+#                   followed by that many action bytes. Inputs are resent until acknowledged,
+#                   so lost and reordered packets need no special handling.
+#   BYE             INPUT_HEADER with no inputs; the sender left the game
+NET_MAGIC = b"TANP"
+NET_VERSION = 1
+PACKET_HELLO = 1
+PACKET_WELCOME = 2
+PACKET_INPUT = 3
+PACKET_BYE = 4
+HANDSHAKE = struct.Struct("<4sBBQBBB")  # magic, version, kind, seed, cols, rows, filled rows
+INPUT_HEADER = struct.Struct("<4sBBiiiHb")  # magic, version, kind, ack, frame, first, count, advantage
+STATE_HEADER = struct.Struct("<hhd")  # cursor x/y and difficulty timer, followed by Board.snapshot()
+NET_DT = 1 / 60  # fixed simulation step shared by both players
+MAX_INPUTS_PER_PACKET = 64
+MAX_ACTIONS_PER_FRAME = 15
+CHECKSUM_INTERVAL = 60  # frames between recorded state checksums (see checksums)
+NO_INPUT = (False, ())
+
+def encode_inputs(inputs):
+    data = bytearray()
+    for shift, actions in inputs:
+        data.append((0x80 if shift else 0) | len(actions))
+        data.extend(actions)
+    return bytes(data)
+
+def decode_inputs(data, offset, count):
+    inputs = []
+    for _ in range(count):
+        head = data[offset]
+        size = head & 0x7F
+        inputs.append((bool(head & 0x80), tuple(data[offset + 1:offset + 1 + size])))
+        offset += 1 + size
+    return inputs
+
+# --------------------
+# Transports
+# --------------------
+class UdpTransport:
+    """
+    Non-blocking UDP socket talking to a single peer. send() and receive() never wait.
+    """
+    def __init__(self, local_address, remote_address=None):
+        self.socket = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+        self.socket.bind(local_address)
+        self.socket.setblocking(False)
+        self.remote_address = remote_address
+        self.packets_sent = self.packets_received = 0
+        self.bytes_sent = 0
+
+    @property
+    def local_address(self):
+        return self.socket.getsockname()
+
+    def send(self, data):
+        self.socket.sendto(data, self.remote_address)
+        self.packets_sent += 1
+        self.bytes_sent += len(data)
+
+    def receive(self):
+        packets = []
+        while True:
+            try:
+                data, address = self.socket.recvfrom(2048)
+            except (BlockingIOError, ConnectionError):
+                # Nothing left (or an ICMP error from a peer that is not listening yet).
+                return packets
+            if self.remote_address is None:
+                self.remote_address = address  # the host learns its peer from the first packet
+            if address == self.remote_address:
+                self.packets_received += 1
+                packets.append(data)
+
+    def close(self):
+        self.socket.close()
+
+class LaggyTransport:
+    """
+    Wraps a transport and holds outgoing packets back to simulate a bad network: each packet
+    is delayed by latency plus a uniform random jitter in [-jitter, +jitter] seconds (so packets
+    can overtake each other) and dropped with probability loss. clock returns the current time
+    in seconds; the harness passes a simulated clock so runs do not depend on the machine.
+    """
+    def __init__(self, transport, latency=0.05, jitter=0.0, loss=0.0, clock=time.perf_counter, seed=None):
+        self.transport = transport
+        self.latency = latency
+        self.jitter = jitter
+        self.loss = loss
+        self.clock = clock
+        self.rng = random.Random(seed)
+        self.queue = []  # heap of (delivery time, sequence number, data)
+        self.sequence = 0
+        self.packets_dropped = 0
+
+    def send(self, data):
+        if self.rng.random() < self.loss:
+            self.packets_dropped += 1
+            return
+        delay = max(0.0, self.latency + self.rng.uniform(-self.jitter, self.jitter))
+        heapq.heappush(self.queue, (self.clock() + delay, self.sequence, data))
+        self.sequence += 1
+
+    def flush(self):
+        # Hand every packet whose delivery time has come to the real transport.
+        now = self.clock()
+        while self.queue and self.queue[0][0] <= now:
+            self.transport.send(heapq.heappop(self.queue)[2])
+
+    def receive(self):
+        self.flush()
+        return self.transport.receive()
+
+    def __getattr__(self, name):
+        return getattr(self.transport, name)
+
+# --------------------
+# Rollback Session
+# --------------------
+class RollbackStats:
+    # Counters reported by RollbackSession.report().
+    def __init__(self):
+        self.frames = 0
+        self.rollbacks = 0
+        self.max_depth = 0
+        self.depths = {}  # rollback depth (frames) -> count
+        self.resimulated_frames = 0
+        self.resimulation_seconds = 0.0
+        self.max_resimulation_seconds = 0.0
+        self.simulation_seconds = 0.0
+        self.prediction_stalls = 0  # frames skipped because remote input was too far behind
+        self.sync_stalls = 0  # frames skipped to let a slower peer catch up
+
+class RollbackSession:
+    """
+    One player's side of a versus game. boards[0]/cursors[0] belong to the host, boards[1] and
+    cursors[1] to the joiner; both boards start from the same seed. advance() simulates one
+    fixed-step frame with the local input, rolling back first if late remote input changed
+    the past. run_for() drives it from a variable frame time (used by Game.run).
+
+    The session runs ahead of the last confirmed remote frame by at most max_prediction
+    frames; beyond that it stalls until input arrives. Every CHECKSUM_INTERVAL frames the
+    CRCs of both players' confirmed states are kept in checksums, so two sides can be compared.
+    """
+    def __init__(self, transport, local_player, seed, cols=GRID_COLS, rows=GRID_ROWS,
+                 filled_rows=FILLED_ROWS, input_delay=2, max_prediction=12, dt=NET_DT,
+                 disconnect_timeout=5.0, clock=time.perf_counter):
+        if input_delay < 0:
+            raise ValueError("input_delay must be 0 or more frames, got %d" % input_delay)
+        self.transport = transport
+        self.local_player = local_player
+        self.remote_player = 1 - local_player
+        self.input_delay = input_delay
+        self.max_prediction = max_prediction
+        self.dt = dt
+        self.disconnect_timeout = disconnect_timeout
+        self.clock = clock
+        self.boards = [Board(seed, cols, rows, filled_rows) for _ in range(2)]
+        # The host answers every HELLO, also after connect() returned (see poll).
+        self.welcome = None
+        if local_player == 0:
+            self.welcome = HANDSHAKE.pack(NET_MAGIC, NET_VERSION, PACKET_WELCOME, seed, cols, rows, filled_rows)
+        self.cursors = [Cursor(cols, rows) for _ in range(2)]
+        self.difficulty_timers = [0.0, 0.0]
+
+        self.frame = 0  # next frame to simulate
+        # Inputs per player by frame; the first input_delay local frames have no input.
+        self.inputs = [{}, {}]
+        for frame in range(input_delay):
+            self.inputs[local_player][frame] = NO_INPUT
+        self.pending_actions = []  # local actions waiting for the next simulated frame
+        self.used_remote = {}  # frame -> remote input the frame was simulated with
+        self.states = {}  # frame -> state saved before simulating it
+        self.checksums = {}  # frame -> (player 0 CRC, player 1 CRC) of the confirmed state before that frame
+        self.local_checksums = {}  # frame -> CRC of the local state, until the remote one is confirmed
+        self.remote_confirmed = -1  # every remote input up to this frame has arrived
+        self.rollback_frame = None  # earliest frame that was simulated with a wrong prediction
+        self.remote_ack = 0  # first local frame the peer has not received yet
+        self.remote_frame = 0  # latest frame the peer reported
+        self.remote_advantage = 0
+        self.remote_quit = False
+        self.last_receive = clock()
+        self.accumulator = 0.0
+        self.stats = RollbackStats()
+
+    @property
+    def local_board(self):
+        return self.boards[self.local_player]
+
+    @property
+    def remote_board(self):
+        return self.boards[self.remote_player]
+
+    # ---- State ----
+    def save_state(self, player):
+        # One player's board, cursor and difficulty timer as one bytes object.
+        cursor = self.cursors[player]
+        return (STATE_HEADER.pack(cursor.x, cursor.y, self.difficulty_timers[player])
+                + self.boards[player].snapshot())
+
+    def load_state(self, player, state):
+        cursor = self.cursors[player]
+        cursor.x, cursor.y, self.difficulty_timers[player] = STATE_HEADER.unpack_from(state, 0)
+        self.boards[player].restore(state[STATE_HEADER.size:])
+
+    # ---- Simulation ----
+    def predict_remote(self):
+        # Prediction for a missing remote input: the last known Left Shift state, no key presses.
+        last = self.inputs[self.remote_player].get(self.remote_confirmed, NO_INPUT)
+        return (last[0], ())
+
+    def simulate_player(self, player, shift, actions):
+        board = self.boards[player]
+        self.difficulty_timers[player] = advance_difficulty(board, self.difficulty_timers[player] + self.dt)
+        advance_frame(board, self.cursors[player], self.dt, shift, actions)
+
+    def simulate_remote(self, frame):
+        # One frame of the remote board, on real input if it has arrived, else on a prediction.
+        remote = self.inputs[self.remote_player].get(frame)
+        if remote is None:
+            remote = self.predict_remote()
+        self.used_remote[frame] = remote
+        self.simulate_player(self.remote_player, *remote)
+
+    def rollback(self):
+        """
+        If remote input contradicted a prediction, restores the remote board as it was before
+        the first wrong frame and simulates it up to the present again. The local board does
+        not depend on remote input and is left alone. Sounds and telemetry of the remote board
+        are muted meanwhile.
+        """
+        if self.rollback_frame is None:
+            return
+        start_frame = self.rollback_frame
+        self.rollback_frame = None
+        depth = self.frame - start_frame
+        start = time.perf_counter()
+        board = self.remote_board
+        muted = (board.audio, board.telemetry)
+        board.audio = board.telemetry = None
+        self.load_state(self.remote_player, self.states[start_frame])
+        for frame in range(start_frame, self.frame):
+            if frame > start_frame:
+                self.states[frame] = self.save_state(self.remote_player)
+            self.simulate_remote(frame)
+        board.audio, board.telemetry = muted
+        elapsed = time.perf_counter() - start
+        stats = self.stats
+        stats.rollbacks += 1
+        stats.max_depth = max(stats.max_depth, depth)
+        stats.depths[depth] = stats.depths.get(depth, 0) + 1
+        stats.resimulated_frames += depth
+        stats.resimulation_seconds += elapsed
+        stats.max_resimulation_seconds = max(stats.max_resimulation_seconds, elapsed)
+
+    def advance(self, shift_pressed=False, actions=()):
+        """
+        Simulates one frame; returns False when the frame had to be skipped (remote input too
+        far behind, or the peer needs time to catch up). Skipped actions are kept for the next frame.
+        """
+        self.pending_actions.extend(actions)
+        self.idle()
+        if self.frame - self.remote_confirmed > self.max_prediction:
+            self.stats.prediction_stalls += 1
+            return False
+        # Time sync: if this side runs clearly ahead of the peer, give it a frame to catch up.
+        if self.frame % 10 == 0 and self.frame_advantage() - self.remote_advantage >= 2:
+            self.stats.sync_stalls += 1
+            return False
+        input_frame = self.frame + self.input_delay
+        self.inputs[self.local_player][input_frame] = (bool(shift_pressed), tuple(self.pending_actions[:MAX_ACTIONS_PER_FRAME]))
+        del self.pending_actions[:MAX_ACTIONS_PER_FRAME]
+        start = time.perf_counter()
+        if self.frame % CHECKSUM_INTERVAL == 0:
+            self.local_checksums[self.frame] = zlib.crc32(self.save_state(self.local_player))
+        self.simulate_player(self.local_player, *self.inputs[self.local_player][self.frame])
+        self.states[self.frame] = self.save_state(self.remote_player)
+        self.simulate_remote(self.frame)
+        self.stats.simulation_seconds += time.perf_counter() - start
+        self.stats.frames += 1
+        self.frame += 1
+        self.send_inputs()
+        self.prune()
+        return True
+
+    def run_for(self, dt, shift_pressed, actions, max_steps=4):
+        # Runs as many fixed steps as dt covers (at most max_steps); actions go into the first one.
+        self.accumulator = min(self.accumulator + dt, max_steps * self.dt)
+        steps = 0
+        while self.accumulator >= self.dt:
+            self.accumulator -= self.dt
+            self.advance(shift_pressed, actions if steps == 0 else ())
+            steps += 1
+        if steps == 0:
+            self.pending_actions.extend(actions)
+            self.idle()
+
+    def idle(self):
+        # Network work without simulating a new frame: receive, roll back if needed, resend.
+        self.poll()
+        self.rollback()
+        self.send_inputs()
+
+    def frame_advantage(self):
+        return self.frame - self.remote_frame
+
+    # ---- Network ----
+    def send_inputs(self):
+        first = self.remote_ack
+        last = min(self.frame + self.input_delay, first + MAX_INPUTS_PER_PACKET)
+        local = self.inputs[self.local_player]
+        inputs = [local[frame] for frame in range(first, last)]
+        header = INPUT_HEADER.pack(NET_MAGIC, NET_VERSION, PACKET_INPUT, self.remote_confirmed + 1, self.frame,
+                                   first, len(inputs), max(-128, min(127, self.frame_advantage())))
+        self.transport.send(header + encode_inputs(inputs))
+
+    def poll(self):
+        remote_inputs = self.inputs[self.remote_player]
+        for data in self.transport.receive():
+            if len(data) == HANDSHAKE.size:
+                # A joiner that is still saying hello lost every WELCOME so far: send another.
+                magic, version, kind = HANDSHAKE.unpack(data)[:3]
+                if magic == NET_MAGIC and version == NET_VERSION and kind == PACKET_HELLO and self.welcome:
+                    self.last_receive = self.clock()
+                    self.transport.send(self.welcome)
+                continue
+            if len(data) < INPUT_HEADER.size:
+                continue
+            magic, version, kind, ack, frame, first, count, advantage = INPUT_HEADER.unpack_from(data, 0)
+            if magic != NET_MAGIC or version != NET_VERSION:
+                continue
+            self.last_receive = self.clock()
+            if kind == PACKET_BYE:
+                self.remote_quit = True
+                continue
+            if kind != PACKET_INPUT:
+                continue
+            self.remote_ack = max(self.remote_ack, ack)
+            if frame >= self.remote_frame:
+                self.remote_frame = frame
+                self.remote_advantage = advantage
+            for offset, remote in enumerate(decode_inputs(data, INPUT_HEADER.size, count)):
+                input_frame = first + offset
+                if input_frame <= self.remote_confirmed or input_frame in remote_inputs:
+                    continue
+                remote_inputs[input_frame] = remote
+                used = self.used_remote.get(input_frame)
+                if used is not None and used != remote:
+                    if self.rollback_frame is None or input_frame < self.rollback_frame:
+                        self.rollback_frame = input_frame
+            while self.remote_confirmed + 1 in remote_inputs:
+                self.remote_confirmed += 1
+
+    def prune(self):
+        # Drop what can no longer be needed: remote states and predictions of confirmed frames
+        # (keeping a checksum now and then) and local inputs that the peer has acknowledged.
+        oldest = min(self.remote_confirmed, self.frame - 1)
+        for frame in [frame for frame in self.states if frame <= oldest]:
+            state = self.states.pop(frame)
+            if frame % CHECKSUM_INTERVAL == 0:
+                crcs = [0, 0]
+                crcs[self.local_player] = self.local_checksums.pop(frame)
+                crcs[self.remote_player] = zlib.crc32(state)
+                self.checksums[frame] = tuple(crcs)
+        for frame in [frame for frame in self.used_remote if frame <= oldest]:
+            del self.used_remote[frame]
+        remote_inputs = self.inputs[self.remote_player]
+        for frame in [frame for frame in remote_inputs if frame < self.remote_confirmed]:
+            del remote_inputs[frame]
+        local_inputs = self.inputs[self.local_player]
+        keep_from = min(self.remote_ack, self.frame)
+        for frame in [frame for frame in local_inputs if frame < keep_from]:
+            del local_inputs[frame]
+
+    def result(self):
+        """
+        Returns why the game ended, or None while it goes on: "top_row" when the local board
+        topped out, "opponent_top_row" once the remote board topped out on confirmed input,
+        "opponent_quit" or "disconnected".
+        """
+        if self.local_board.top_row_timer >= GAME_OVER_TIME:
+            return "top_row"
+        if self.remote_board.top_row_timer >= GAME_OVER_TIME and self.remote_confirmed >= self.frame - 1:
+            return "opponent_top_row"
+        if self.remote_quit:
+            return "opponent_quit"
+        if self.clock() - self.last_receive > self.disconnect_timeout:
+            return "disconnected"
+        return None
+
+    def close(self):
+        # Tell the peer we are leaving (best effort) and release the socket.
+        self.transport.send(INPUT_HEADER.pack(NET_MAGIC, NET_VERSION, PACKET_BYE, self.remote_confirmed + 1,
+                                              self.frame, 0, 0, 0))
+        if hasattr(self.transport, "flush"):
+            self.transport.flush()
+        self.transport.close()
+
+    def report(self):
+        stats = self.stats
+        return {
+            "result": self.result(),
+            "frames": stats.frames,
+            "rollbacks": stats.rollbacks,
+            "mean_depth": round(stats.resimulated_frames / stats.rollbacks, 2) if stats.rollbacks else 0.0,
+            "max_depth": stats.max_depth,
+            "depths": dict(sorted(stats.depths.items())),
+            "resimulated_frames": stats.resimulated_frames,
+            "resim_ms_per_rollback": round(1000 * stats.resimulation_seconds / stats.rollbacks, 3) if stats.rollbacks else 0.0,
+            "resim_ms_max": round(1000 * stats.max_resimulation_seconds, 3),
+            "resim_ms_per_frame": round(1000 * stats.resimulation_seconds / stats.resimulated_frames, 3)
+                                  if stats.resimulated_frames else 0.0,
+            "sim_ms_per_frame": round(1000 * stats.simulation_seconds / stats.frames, 3) if stats.frames else 0.0,
+            "prediction_stalls": stats.prediction_stalls,
+            "sync_stalls": stats.sync_stalls,
+        }
+
+# --------------------
+# Connecting
+# --------------------
+def connect(host_port=None, join_address=None, seed=None, cols=GRID_COLS, rows=GRID_ROWS,
+            filled_rows=FILLED_ROWS, timeout=60.0, **session_options):
+    """
+    Blocks until a peer is connected and returns the RollbackSession. The host listens on
+    host_port and picks the seed and grid size; the joiner connects to join_address
+    ("host", port) and takes the host's settings.
+    """
+    if host_port is not None:
+        transport = UdpTransport(("0.0.0.0", host_port))
+        local_player = 0
+        if seed is None:
+            seed = random.getrandbits(63)
+    else:
+        transport = UdpTransport(("0.0.0.0", 0), join_address)
+        local_player = 1
+    deadline = time.perf_counter() + timeout
+    welcome = None
+    while welcome is None:
+        if time.perf_counter() > deadline:
+            transport.close()
+            raise TimeoutError("no peer answered within %.0f seconds" % timeout)
+        if local_player == 1:
+            transport.send(HANDSHAKE.pack(NET_MAGIC, NET_VERSION, PACKET_HELLO, 0, 0, 0, 0))
+        for data in transport.receive():
+            if len(data) != HANDSHAKE.size:
+                continue
+            magic, version, kind, packet_seed, packet_cols, packet_rows, packet_filled = HANDSHAKE.unpack(data)
+            if magic != NET_MAGIC or version != NET_VERSION:
+                continue
+            if local_player == 0 and kind == PACKET_HELLO:
+                welcome = (seed, cols, rows, filled_rows)
+                # Sent a few times; if all of them get lost, the joiner keeps saying hello and the
+                # session answers it from poll().
+                for _ in range(3):
+                    transport.send(HANDSHAKE.pack(NET_MAGIC, NET_VERSION, PACKET_WELCOME, seed, cols, rows, filled_rows))
+            elif local_player == 1 and kind == PACKET_WELCOME:
+                welcome = (packet_seed, packet_cols, packet_rows, packet_filled)
+        time.sleep(0.05)
+    seed, cols, rows, filled_rows = welcome
+    return RollbackSession(transport, local_player, seed, cols=cols, rows=rows, filled_rows=filled_rows,
+                           **session_options)
+
+# --------------------
+# Loopback Harness
+# --------------------
+class ScriptedPlayer:
+    # Seeded stand-in for a player: moves and swaps about actions_per_second times per second.
+    def __init__(self, seed, actions_per_second=6.0, dt=NET_DT):
+        self.rng = random.Random(seed)
+        self.chance = actions_per_second * dt
+        self.shift = False
+
+    def next_input(self):
+        # Holds Left Shift now and then, for about a third of a second.
+        if self.rng.random() < (0.05 if self.shift else 0.002):
+            self.shift = not self.shift
+        if self.rng.random() < self.chance:
+            return self.shift, [self.rng.randint(ACTION_LEFT, ACTION_SWAP)]
+        return self.shift, []
+
+def run_loopback(seconds=30.0, latency=0.05, jitter=0.02, loss=0.0, seed=1, input_delay=2,
+                 max_prediction=12, cols=GRID_COLS, rows=GRID_ROWS, filled_rows=FILLED_ROWS):
+    """
+    Plays two scripted players against each other over two UDP sockets on 127.0.0.1, with
+    latency, jitter and loss injected by LaggyTransport on a simulated clock that advances
+    one frame per step. Afterwards both sides exchange their remaining input and the
+    confirmed state checksums are compared. Returns (reports, matched checksums, mismatches).
+    """
+    now = [0.0]
+    clock = lambda: now[0]
+    sockets = [UdpTransport(("127.0.0.1", 0)) for _ in range(2)]
+    sockets[0].remote_address = sockets[1].local_address
+    sockets[1].remote_address = sockets[0].local_address
+    sessions = [
+        RollbackSession(LaggyTransport(sockets[player], latency, jitter, loss, clock, seed=seed * 2 + player),
+                        player, seed, cols=cols, rows=rows, filled_rows=filled_rows, input_delay=input_delay,
+                        max_prediction=max_prediction, disconnect_timeout=float("inf"), clock=clock)
+        for player in range(2)
+    ]
+    players = [ScriptedPlayer(seed * 100 + player) for player in range(2)]
+    for _ in range(round(seconds / NET_DT)):
+        now[0] += NET_DT
+        for session, player in zip(sessions, players):
+            if session.local_board.top_row_timer < 3 and session.remote_board.top_row_timer < 3:
+                session.advance(*player.next_input())
+            else:
+                session.idle()
+    # Let the last inputs (and their resends) arrive: no new frames, only network work.
+    for _ in range(round(2 * (latency + jitter + 0.5) / NET_DT)):
+        now[0] += NET_DT
+        for session in sessions:
+            session.idle()
+            session.prune()
+    common = sorted(set(sessions[0].checksums) & set(sessions[1].checksums))
+    mismatches = [frame for frame in common if sessions[0].checksums[frame] != sessions[1].checksums[frame]]
+    reports = [session.report() for session in sessions]
+    for session in sessions:
+        session.transport.close()
+    return reports, len(common), mismatches
+
+def main(argv):
+    # python netplay.py loopback [--latency MS] [--jitter MS] [--loss P] [--seconds S]
+    parser = argparse.ArgumentParser(description="Rollback netplay loopback harness")
+    parser.add_argument("command", choices=("loopback",))
+    parser.add_argument("--seconds", type=float, default=30.0, help="simulated game time")
+    parser.add_argument("--latency", type=float, default=50.0, help="one-way delay in milliseconds")
+    parser.add_argument("--jitter", type=float, default=20.0, help="+/- random delay in milliseconds")
+    parser.add_argument("--loss", type=float, default=0.0, help="packet loss probability")
+    parser.add_argument("--input-delay", type=int, default=2, help="frames of local input delay")
+    parser.add_argument("--max-prediction", type=int, default=12, help="frames to run ahead of remote input")
+    parser.add_argument("--seed", type=int, default=1)
+    args = parser.parse_args(argv)
+    reports, compared, mismatches = run_loopback(
+        args.seconds, args.latency / 1000, args.jitter / 1000, args.loss, args.seed,
+        args.input_delay, args.max_prediction)
+    for player, report in enumerate(reports):
+        print("player %d:" % player)
+        for key, value in report.items():
+            print("  %-22s %s" % (key, value))
+    print("checksums compared: %d, mismatches: %s" % (compared, mismatches or "none"))
+    return 1 if mismatches or not compared else 0
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv[1:]))
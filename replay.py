@@ -0,0 +1,201 @@
+import mmap
+import struct
+import sys
+from array import array
+import numpy as np
+
+# --------------------
+# Replay Archive Format
+# --------------------
+# A replay stores the input stream (per-frame dt, Left Shift state and gameplay actions) plus
+# periodic keyframes (full Board.snapshot() and cursor/game clock state). Seeking restores the
+# nearest keyframe before the target and simulates forward from there.
+#
+# Layout (little-endian):
+#   header      REPLAY_HEADER (fixed size; holds the summary, so scanning reads only this)
+#   keyframes   KEYFRAME_STATE + Board.snapshot() blobs, appended while the game runs
+#   frames      FRAME_DTYPE records, one per simulated frame
+#   events      uint8 action codes, frame by frame (FRAME_DTYPE.event_count per frame)
+#   index       INDEX_DTYPE records, one per keyframe
+# The header is rewritten with the section offsets and the complete flag when recording ends.
+REPLAY_MAGIC = b"TARP"
+REPLAY_VERSION = 1
+REPLAY_HEADER = struct.Struct("<4sHBxIIIdqHxxdQQQ")
+KEYFRAME_STATE = struct.Struct("<hhdd")  # cursor x, cursor y, total_time, difficulty_timer
+FRAME_DTYPE = np.dtype([("dt", "<f8"), ("shift", "u1"), ("event_count", "u1")])
+INDEX_DTYPE = np.dtype([("frame", "<u4"), ("time", "<f8"), ("offset", "<u8"), ("length", "<u4")])
+
+def read_summary(path):
+    """
+    Reads only the fixed-size header of a replay file and returns its summary as a dict.
+    """
+    with open(path, "rb") as f:
+        data = f.read(REPLAY_HEADER.size)
+    if len(data) < REPLAY_HEADER.size:
+        raise ValueError("%s: truncated replay header" % path)
+    (magic, version, complete, frame_count, event_count, keyframe_count, duration, score,
+     largest_match, keyframe_interval, frames_offset, events_offset, index_offset) = REPLAY_HEADER.unpack(data)
+    if magic != REPLAY_MAGIC or version != REPLAY_VERSION:
+        raise ValueError("%s: not a replay file (or unsupported version)" % path)
+    return {
+        "path": path, "complete": bool(complete), "frames": frame_count, "events": event_count,
+        "keyframes": keyframe_count, "duration": duration, "score": score,
+        "largest_match": largest_match, "keyframe_interval": keyframe_interval,
+        "frames_offset": frames_offset, "events_offset": events_offset, "index_offset": index_offset,
+    }
+
+def scan_replays(paths):
+    # Summaries of many replays without loading their frames or keyframes.
+    return [read_summary(path) for path in paths]
+
+# --------------------
+# Recording
+# --------------------
+class ReplayRecorder:
+    """
+    Records a game while it runs. Frames are kept in compact arrays (about 10 bytes each);
+    keyframes are written to the file as they are taken, every keyframe_interval seconds.
+    """
+    def __init__(self, path, game, keyframe_interval=5.0):
+        self.file = open(path, "wb")
+        self.file.write(bytes(REPLAY_HEADER.size))  # placeholder until close()
+        self.keyframe_interval = keyframe_interval
+        self.frame_dt = array("d")
+        self.frame_shift = bytearray()
+        self.frame_event_count = bytearray()
+        self.events = bytearray()
+        self.index = []
+        self.time = 0.0
+        self.next_keyframe = keyframe_interval
+        self.last_score = game.board.score
+        self.largest_match = 0
+        self.write_keyframe(game)
+
+    def record_frame(self, dt, shift_pressed, actions, game):
+        # Called once per frame after the frame has been simulated.
+        self.frame_dt.append(dt)
+        self.frame_shift.append(1 if shift_pressed else 0)
+        self.frame_event_count.append(len(actions))
+        self.events.extend(actions)
+        self.time += dt
+        # At most one match is processed per frame and it scores 100 per panel.
+        gained = game.board.score - self.last_score
+        if gained > 0:
+            self.largest_match = max(self.largest_match, gained // 100)
+        self.last_score = game.board.score
+        if self.time >= self.next_keyframe:
+            self.next_keyframe += self.keyframe_interval
+            self.write_keyframe(game)
+
+    def write_keyframe(self, game):
+        payload = KEYFRAME_STATE.pack(game.cursor.x, game.cursor.y, game.total_time, game.difficulty_timer)
+        payload += game.board.snapshot()
+        self.index.append((len(self.frame_dt), self.time, self.file.tell(), len(payload)))
+        self.file.write(payload)
+
+    def close(self):
+        frames = np.empty(len(self.frame_dt), dtype=FRAME_DTYPE)
+        frames["dt"] = np.frombuffer(self.frame_dt, dtype=np.float64)
+        frames["shift"] = np.frombuffer(bytes(self.frame_shift), dtype=np.uint8)
+        frames["event_count"] = np.frombuffer(bytes(self.frame_event_count), dtype=np.uint8)
+        frames_offset = self.file.tell()
+        self.file.write(frames.tobytes())
+        events_offset = self.file.tell()
+        self.file.write(bytes(self.events))
+        index_offset = self.file.tell()
+        self.file.write(np.array(self.index, dtype=INDEX_DTYPE).tobytes())
+        self.file.seek(0)
+        self.file.write(REPLAY_HEADER.pack(
+            REPLAY_MAGIC, REPLAY_VERSION, 1, len(frames), len(self.events), len(self.index), self.time,
+            self.last_score, self.largest_match, self.keyframe_interval,
+            frames_offset, events_offset, index_offset))
+        self.file.close()
+
+# --------------------
+# Playback / Seeking
+# --------------------
+class ReplayState:
+    # Game state reconstructed by ReplayReader.state_at().
+    def __init__(self, board, cursor, total_time, difficulty_timer, frame):
+        self.board = board
+        self.cursor = cursor
+        self.total_time = total_time
+        self.difficulty_timer = difficulty_timer
+        self.frame = frame
+
+class ReplayReader:
+    """
+    Memory-maps a complete replay file. Frames, events and the keyframe index are NumPy views
+    of the mapping; keyframe blobs are only read when a seek needs them.
+    """
+    def __init__(self, path):
+        self.summary = read_summary(path)
+        if not self.summary["complete"]:
+            raise ValueError("%s: replay was not closed (no frame table or index)" % path)
+        self.file = open(path, "rb")
+        self.map = mmap.mmap(self.file.fileno(), 0, access=mmap.ACCESS_READ)
+        s = self.summary
+        self.frames = np.frombuffer(self.map, dtype=FRAME_DTYPE, count=s["frames"], offset=s["frames_offset"])
+        self.events = np.frombuffer(self.map, dtype=np.uint8, count=s["events"], offset=s["events_offset"])
+        self.index = np.frombuffer(self.map, dtype=INDEX_DTYPE, count=s["keyframes"], offset=s["index_offset"])
+        # Game time at the end of each frame (accumulated in the same order as the recorder).
+        self.frame_end_times = np.cumsum(self.frames["dt"])
+        self.event_starts = np.concatenate(([0], np.cumsum(self.frames["event_count"], dtype=np.int64)))
+
+    def keyframe_state(self, keyframe):
+        from main import Board, Cursor
+        entry = self.index[keyframe]
+        offset = int(entry["offset"])
+        cursor_x, cursor_y, total_time, difficulty_timer = KEYFRAME_STATE.unpack_from(self.map, offset)
+        snapshot = self.map[offset + KEYFRAME_STATE.size:offset + int(entry["length"])]
+        board = Board.from_snapshot(snapshot)
+        cursor = Cursor(board.cols, board.rows)
+        cursor.x, cursor.y = cursor_x, cursor_y
+        return ReplayState(board, cursor, total_time, difficulty_timer, int(entry["frame"]))
+
+    def state_at(self, t):
+        """
+        Returns the ReplayState after all frames that ended at or before game time t,
+        restored from the nearest earlier keyframe.
+        """
+        from main import advance_frame, advance_difficulty
+        target = int(np.searchsorted(self.frame_end_times, t, side="right"))
+        keyframe = int(np.searchsorted(self.index["frame"], target, side="right")) - 1
+        state = self.keyframe_state(keyframe)
+        for frame in range(state.frame, target):
+            dt = float(self.frames["dt"][frame])
+            actions = self.events[self.event_starts[frame]:self.event_starts[frame + 1]].tolist()
+            state.total_time += dt
+            state.difficulty_timer = advance_difficulty(state.board, state.difficulty_timer + dt)
+            advance_frame(state.board, state.cursor, dt, bool(self.frames["shift"][frame]), actions)
+        state.frame = target
+        return state
+
+    def close(self):
+        # Drop the NumPy views first: the mapping cannot close while they are exported.
+        self.frames = self.events = self.index = None
+        self.map.close()
+        self.file.close()
+
+def main(argv):
+    # python replay.py scan FILE...        list replay summaries (header only)
+    # python replay.py seek FILE SECONDS   restore the board at a timestamp
+    if len(argv) >= 2 and argv[0] == "scan":
+        summaries = sorted(scan_replays(argv[1:]), key=lambda s: s["score"], reverse=True)
+        for s in summaries:
+            print("%-40s score %8d  duration %8.1fs  largest match %2d%s" % (
+                s["path"], s["score"], s["duration"], s["largest_match"], "" if s["complete"] else "  (incomplete)"))
+    elif len(argv) == 3 and argv[0] == "seek":
+        reader = ReplayReader(argv[1])
+        state = reader.state_at(float(argv[2]))
+        print("frame %d  time %.2fs  score %d  cursor (%d, %d)" % (
+            state.frame, state.total_time, state.board.score, state.cursor.x, state.cursor.y))
+        for row in range(len(state.board.grid[0])):
+            print(" ".join("." if col[row] is None else str(col[row].color_index) for col in state.board.grid))
+    else:
+        print("usage: replay.py scan FILE... | replay.py seek FILE SECONDS")
+        return 1
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv[1:]))
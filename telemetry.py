@@ -0,0 +1,109 @@
+import asyncio
+import json
+import numpy as np
+
+# --------------------
+# Session Telemetry
+# --------------------
+class SessionTelemetry:
+    """
+    Per-game telemetry stream written as JSONL.
+    Events are appended to a bounded in-memory buffer from the frame path (a dict append, nothing else);
+    serialization and file writes happen in run_flusher(), an asyncio task that hands each batch to
+    the default executor. Only one write is in flight at a time: while the disk is slow the buffer
+    keeps filling, and once it reaches capacity new events are counted and dropped instead of
+    stalling the game. The drop count is written as a "dropped" event with the next batch.
+    """
+    def __init__(self, path, capacity=4096, flush_interval=1.0, summary_interval=5.0):
+        self.path = path
+        self.capacity = capacity
+        self.flush_interval = flush_interval
+        self.summary_interval = summary_interval
+        self.file = open(path, "a", encoding="utf-8")
+        self.buffer = []
+        self.dropped = 0
+        self.closed = False
+        self.pending_write = None  # executor future of the batch currently being written
+
+        # Game clock (seconds of simulated time) and frame counter used to stamp events.
+        self.time = 0.0
+        self.frame = 0
+        self.next_summary = summary_interval
+        self.frame_times = []
+
+    def tick(self, dt, score):
+        """
+        Advances the telemetry clock by one frame and emits the periodic score sample
+        and frame-time summary every summary_interval seconds.
+        """
+        self.frame += 1
+        self.time += dt
+        self.frame_times.append(dt)
+        if self.time >= self.next_summary:
+            self.next_summary += self.summary_interval
+            self.record("score", score=score)
+            self.record_frame_summary()
+
+    def record(self, kind, **fields):
+        # Called from the frame path: never blocks, never serializes.
+        if len(self.buffer) >= self.capacity:
+            self.dropped += 1
+            return
+        fields["event"] = kind
+        fields["t"] = round(self.time, 4)
+        fields["frame"] = self.frame
+        self.buffer.append(fields)
+
+    def record_frame_summary(self):
+        if not self.frame_times:
+            return
+        frame_ms = np.asarray(self.frame_times) * 1000.0
+        self.frame_times = []
+        p50, p95, p99 = np.percentile(frame_ms, (50, 95, 99))
+        self.record("frame_time", count=int(frame_ms.size), mean_ms=round(float(frame_ms.mean()), 3),
+                    p50_ms=round(float(p50), 3), p95_ms=round(float(p95), 3),
+                    p99_ms=round(float(p99), 3), max_ms=round(float(frame_ms.max()), 3))
+
+    def take_batch(self):
+        # Swap the buffer out so the frame path immediately gets an empty one.
+        batch = self.buffer
+        self.buffer = []
+        if self.dropped:
+            batch.append({"event": "dropped", "t": round(self.time, 4), "frame": self.frame, "count": self.dropped})
+            self.dropped = 0
+        return batch
+
+    def write_batch(self, batch):
+        # Runs in the executor thread; batch dicts are no longer touched by the game.
+        self.file.write("".join(json.dumps(event, separators=(",", ":")) + "\n" for event in batch))
+        self.file.flush()
+
+    async def run_flusher(self):
+        loop = asyncio.get_running_loop()
+        while not self.closed:
+            await asyncio.sleep(self.flush_interval)
+            if self.closed:
+                break
+            batch = self.take_batch()
+            if batch:
+                self.pending_write = loop.run_in_executor(None, self.write_batch, batch)
+                await self.pending_write
+                self.pending_write = None
+
+    async def close(self, cause, score):
+        """
+        Records the game-over event, waits for the in-flight batch and writes whatever is
+        still buffered directly (the game loop has ended, so frame time no longer matters).
+        """
+        if self.closed:
+            return
+        self.closed = True
+        self.record_frame_summary()
+        if self.pending_write is not None:
+            await self.pending_write
+        batch = self.take_batch()
+        # The final event bypasses the capacity check so the cause is never lost.
+        batch.append({"event": "game_over", "t": round(self.time, 4), "frame": self.frame,
+                      "cause": cause, "score": score})
+        self.write_batch(batch)
+        self.file.close()